@@ -1,27 +1,32 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from dotenv import load_dotenv
 import os
+import uuid
 import tempfile
 import google.generativeai as genai
-from model.predict import predict_stockout
-from model.pipeline import build_pipeline
+from model.predict import predict_stockout, predict_stockout_batch, forecast_products
+from model.series_store import FREQUENCIES, parse_day
+from model.result_stream import select_columns, page, stream_json, stream_ndjson
+from model.stockout import format_dates
+from model.result_cache import save_upload, cache_key, get_result, put_result
+from model.model_registry import model_version
+from model.festival_calendar import get_calendar
+from model.feature_store import get_features, get_series_store, dataset_sha256
+from model import instrumentation
+import time
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import date
-import joblib
-
-MODEL_PATH = os.path.join("model", "demand_model.pkl")
-
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError("Model file not found.")
-
-model = joblib.load(MODEL_PATH)
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from sqlalchemy import insert, inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import pandas as pd
 
-print("✅ ML model loaded successfully")
 load_dotenv()
 # ---------------- API KEY ----------------
 API_KEY = os.getenv("GEMINI_API_KEY")
@@ -36,11 +41,52 @@ app = Flask(__name__)
 CORS(app)
 
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'instance/site.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv(
+    "DATABASE_URL",
+    'sqlite:///' + os.path.join(basedir, 'instance/site.db')
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
 
+# ---------------- Prediction Jobs Config ----------------
+# Uploads for /predict-jobs are kept here until their job finishes, and
+# finished results as <job_id>.result.feather
+JOB_DIR = os.path.join(basedir, 'instance', 'jobs')
+JOB_WORKERS = int(os.getenv("PREDICT_JOB_WORKERS", "2"))
+# Queued + running jobs allowed before submissions get a 503
+JOB_QUEUE_LIMIT = int(os.getenv("PREDICT_JOB_QUEUE_LIMIT", "16"))
+# A job still queued/running this long after it was queued/started (e.g.
+# lost to a restart) is marked failed and stops counting towards the limit
+JOB_TIMEOUT_SECONDS = float(os.getenv("PREDICT_JOB_TIMEOUT_SECONDS", "3600"))
+# Finished results are kept this long, then GET .../result returns 410
+JOB_RETENTION_SECONDS = float(os.getenv("PREDICT_JOB_RETENTION_SECONDS", str(24 * 3600)))
+
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS)
+
+# ---------------- Email Outbox Config ----------------
+# Point SMTP_HOST/SMTP_PORT at a local server (e.g. aiosmtpd on 8025 with
+# SMTP_SSL=0) to exercise delivery without sending real mail.
+# Queued mail is delivered by one dispatcher per deployment, started
+# explicitly: `flask --app app outbox-worker` as its own process, or in the
+# web process with OUTBOX_WORKER=1 (python app.py turns it on by default).
+# Importing the app (gunicorn workers, tests, benchmarks) starts nothing.
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+# Concurrent SMTP connections, each reused across messages
+OUTBOX_POOL_SIZE = int(os.getenv("OUTBOX_POOL_SIZE", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+# Retry n waits OUTBOX_BACKOFF_SECONDS * 2**(n-1), capped at an hour
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+# A claimed message not finished within the lease is picked up again
+OUTBOX_LEASE_SECONDS = 600
+
+outbox_executor = ThreadPoolExecutor(max_workers=OUTBOX_POOL_SIZE)
+
 # ---------------- Models ----------------
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -77,10 +123,146 @@ class StockoutReminder(db.Model):
     stockout_date = db.Column(db.Date, nullable=False)
     reminder_stage = db.Column(db.Integer, default=0)
 
+    # The reminder job selects by date range and groups by recipient;
+    # the unique key lets re-submitted results be skipped on insert
+    __table_args__ = (
+        db.Index("ix_stockout_reminder_date_email", "stockout_date", "email"),
+        db.Index(
+            "uq_stockout_reminder_email_product_date",
+            "email", "product_name", "stockout_date",
+            unique=True
+        ),
+    )
+
+
+class ProductForecast(db.Model):
+    # Materialized dashboard forecast, one row per product, rebuilt in bulk
+    # whenever the dashboard dataset or the calendar day changes
+    product_id = db.Column(db.Integer, primary_key=True)
+    product_name = db.Column(db.String(150))
+    category = db.Column(db.String(100))
+
+    avg_daily_sales = db.Column(db.Float, nullable=False)
+    predicted_daily_demand = db.Column(db.Float, nullable=False)
+    days_left = db.Column(db.Integer, nullable=False)
+    stock_status = db.Column(db.String(20), nullable=False)
+    stockout_date = db.Column(db.Date, nullable=False)
+
+    dataset_sha256 = db.Column(db.String(64), nullable=False, index=True)
+    computed_on = db.Column(db.Date, nullable=False)
+
+
+class EmailOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+
+    # pending -> sending -> sent | pending (retry) | failed
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # When a pending message is due, or when a sending lease expires
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    # Duration of the successful SMTP send
+    latency_ms = db.Column(db.Float)
+
+    __table_args__ = (
+        db.Index("ix_email_outbox_status_due", "status", "next_attempt_at"),
+    )
+
+
+class PredictJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    # queued -> running -> done | failed; cancelling/cancelled on request
+    status = db.Column(db.String(20), nullable=False, default="queued", index=True)
+    warehouse_code = db.Column(db.String(50))
+    file_path = db.Column(db.String(300), nullable=False)
+    # Name of the uploaded file (file_path is the job's own copy)
+    source_name = db.Column(db.String(300))
+
+    total_rows = db.Column(db.Integer)
+    error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+
+# ---------------- Request Metrics ----------------
+@app.before_request
+def start_request_timer():
+    if instrumentation.ENABLED:
+        g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_latency(response):
+    start = g.pop("request_start", None)
+
+    if start is not None:
+        # Route template (not the raw path) keeps label cardinality bounded
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        instrumentation.observe_request(
+            request.method, route, response.status_code, time.perf_counter() - start
+        )
+
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    # Prometheus text format; empty unless METRICS_ENABLED=1
+    return app.response_class(
+        instrumentation.render_metrics(),
+        mimetype="text/plain; version=0.0.4"
+    )
+
 
 # ---------------- Create Tables ----------------
+def _migrate_reminder_indexes():
+    # Rows duplicated before the unique key existed would block creating it
+    reminder_table = StockoutReminder.__tablename__
+    existing_indexes = {i["name"] for i in inspect(db.engine).get_indexes(reminder_table)}
+
+    if "uq_stockout_reminder_email_product_date" not in existing_indexes:
+        with db.engine.begin() as conn:
+            conn.execute(text(f"""
+                DELETE FROM {reminder_table}
+                WHERE id NOT IN (
+                    SELECT MIN(id) FROM {reminder_table}
+                    GROUP BY email, product_name, stockout_date
+                )
+            """))
+
+    # create_all() skips tables that already exist, so add any indexes
+    # declared since the table was first created
+    for index in StockoutReminder.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+
+
+def _migrate_predict_job_columns():
+    # create_all() does not add columns to an existing table
+    columns = {c["name"] for c in inspect(db.engine).get_columns(PredictJob.__tablename__)}
+
+    if "source_name" not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE {PredictJob.__tablename__} ADD COLUMN source_name VARCHAR(300)"
+            ))
+
+
 with app.app_context():
     db.create_all()
+    _migrate_reminder_indexes()
+    _migrate_predict_job_columns()
+
+# ---------------- Festival Calendar ----------------
+# Compiled once at startup; the pipeline and the dashboard share it
+get_calendar()
 
 # ---------------- Auth Routes ----------------
 @app.route('/register', methods=['POST'])
@@ -151,26 +333,46 @@ def create_stockout_reminders():
 
     if not email or not results:
         return jsonify({"message": "Invalid data"}), 400
-    saved_products = []
-    for item in results:
-        try:
-            stockout_date = datetime.strptime(
-                item["stockout_date"], "%Y-%m-%d"
-            ).date()
-
-            reminder = StockoutReminder(
-                email=email,
-                product_name=item["product_name"],
-                stockout_date=stockout_date
-            )
-            db.session.add(reminder)
-            saved_products.append(
-                f"• {item['product_name']} (Stockout: {item['stockout_date']})"
-            )
-        except Exception:
-            continue
+
+    # Parse every row at once; rows without a product name or a valid
+    # YYYY-MM-DD date are skipped, as are repeats within the request
+    items = pd.DataFrame(
+        [item for item in results if isinstance(item, dict)],
+        columns=["product_name", "stockout_date"]
+    )
+    items["stockout_date"] = pd.to_datetime(
+        items["stockout_date"], format="%Y-%m-%d", errors="coerce"
+    )
+    items = items.dropna(subset=["product_name", "stockout_date"])
+    items = items.drop_duplicates(subset=["product_name", "stockout_date"])
+
+    rows = [
+        {"email": email, "product_name": name, "stockout_date": day}
+        for name, day in zip(
+            items["product_name"].astype(str).tolist(),
+            items["stockout_date"].dt.date.tolist()
+        )
+    ]
+
+    inserted = 0
+
+    if rows:
+        # Reminders already stored for this email are left untouched
+        result = db.session.execute(
+            sqlite_insert(StockoutReminder.__table__).on_conflict_do_nothing(
+                index_elements=["email", "product_name", "stockout_date"]
+            ),
+            rows
+        )
+        inserted = max(result.rowcount, 0)
 
     db.session.commit()
+
+    saved_products = [
+        f"• {row['product_name']} (Stockout: {row['stockout_date']:%Y-%m-%d})"
+        for row in rows
+    ]
+
     # check_and_send_reminders()
     # 🔔 IMMEDIATE CONFIRMATION EMAIL
     product_list = "\n".join(saved_products)
@@ -194,7 +396,11 @@ Tracked products:
 – InventOPredict Team
 """
     )
-    return jsonify({"message": "Reminders created"}), 201
+    return jsonify({
+        "message": "Reminders created",
+        "inserted": inserted,
+        "skipped": len(results) - inserted
+    }), 201
 
 
 
@@ -265,6 +471,49 @@ def get_feedback():
 
 
 # ---------------- Prediction Route ----------------
+def _stream_result(pred_df, cursor=None, result_id=None):
+    # Streams a prediction result as chunked JSON (default) or NDJSON
+    # (?format=ndjson), optionally narrowed to ?fields=a,b and cut to
+    # ?limit=N rows from cursor. Later pages are GETs on the stored result
+    # (/predict-results/<result_id> or /predict-jobs/<id>/result) with
+    # ?cursor=<next_cursor of the previous page>.
+    args = request.args
+
+    try:
+        rows, next_cursor = page(
+            select_columns(pred_df, args.get("fields")),
+            cursor=cursor,
+            limit=args.get("limit")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if args.get("format") == "ndjson":
+        response = app.response_class(
+            stream_with_context(stream_ndjson(rows)),
+            mimetype="application/x-ndjson"
+        )
+        response.headers["X-Total-Rows"] = str(len(pred_df))
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if result_id is not None:
+            response.headers["X-Result-Id"] = result_id
+        return response
+
+    header = {
+        "summary": "Stock prediction analysis completed.",
+        "total_rows": len(pred_df),
+        "next_cursor": next_cursor
+    }
+    if result_id is not None:
+        header["result_id"] = result_id
+
+    return app.response_class(
+        stream_with_context(stream_json(rows, **header)),
+        mimetype="application/json"
+    )
+
+
 @app.route('/predict', methods=['POST'])
 def predict():
 
@@ -276,22 +525,43 @@ def predict():
     tmp_path = None
 
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-            file.save(tmp.name)
-            tmp_path = tmp.name
+        # Save uploaded file temporarily, hashing it on the way
+        tmp_path, upload_sha256 = save_upload(file)
+
+        # The same workbook under the same model gives the same result
+        # (e.g. frontend retries), so it is served from the result cache
+        key = cache_key(upload_sha256, model_version(), get_calendar().digest)
+        pred_df = get_result(key)
+        instrumentation.observe_result_cache(pred_df is not None)
+
+        cache_status = "hit"
+        stored = pred_df is not None
+
+        if pred_df is None:
+            cache_status = "miss"
+
+            # Run prediction; a warehouse_code lets returning warehouses reuse
+            # their previously folded aggregates and only process new rows
+            pred_df = predict_stockout(
+                tmp_path,
+                state_key=request.form.get("warehouse_code") or None,
+                sha256=upload_sha256,
+                source_name=file.filename or None
+            )
 
-        # Run prediction
-        pred_df = predict_stockout(tmp_path)
+            if pred_df is None or pred_df.empty:
+                return jsonify({"error": "Prediction result is empty"}), 500
 
-        if pred_df is None or pred_df.empty:
-            return jsonify({"error": "Prediction result is empty"}), 500
+            stored = put_result(key, pred_df)
 
-        return jsonify({
-            "summary": "Stock prediction analysis completed.",
-            "total_rows": len(pred_df),
-            "fields": pred_df.to_dict(orient="records")
-        })
+        # First page only; the rest is paged from the result cache, so
+        # result_id is left out when it could not be stored
+        response = _stream_result(pred_df, result_id=key if stored else None)
+
+        if not isinstance(response, tuple):
+            response.headers["X-Result-Cache"] = cache_status
+
+        return response
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -301,6 +571,291 @@ def predict():
         if tmp_path and os.path.exists(tmp_path):
             os.remove(tmp_path)
 
+
+@app.route('/predict-results/<result_id>', methods=['GET'])
+def get_predict_result(result_id):
+    # Pages of a /predict result (result_id from its first response)
+    pred_df = get_result(result_id)
+
+    if pred_df is None:
+        return jsonify({"error": "Result not found or expired"}), 404
+
+    return _stream_result(pred_df, cursor=request.args.get("cursor"), result_id=result_id)
+
+
+@app.route('/predict-batch', methods=['POST'])
+def predict_batch():
+
+    files = request.files.getlist('files')
+
+    if not files:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    # Optional warehouse codes, one per file; defaults to the file name
+    codes = request.form.getlist('warehouse_codes')
+
+    if codes and len(codes) != len(files):
+        return jsonify({"error": "warehouse_codes must match the number of files"}), 400
+
+    tmp_paths = []
+
+    try:
+        datasets = {}
+        source_names = {}
+
+        for i, file in enumerate(files):
+            key = codes[i] if codes else os.path.splitext(file.filename or f"file_{i}")[0]
+
+            if key in datasets:
+                return jsonify({"error": f"Duplicate warehouse: {key}"}), 400
+
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
+                file.save(tmp.name)
+                tmp_paths.append(tmp.name)
+
+            datasets[key] = tmp_paths[-1]
+            source_names[key] = file.filename or None
+
+        results, errors = predict_stockout_batch(datasets, source_names=source_names)
+
+        return jsonify({
+            "summary": "Batch stock prediction analysis completed.",
+            "results": {
+                key: {
+                    "total_rows": len(pred_df),
+                    "fields": pred_df.assign(
+                        stockout_date=format_dates(pred_df["stockout_date"])
+                    ).to_dict(orient="records")
+                }
+                for key, pred_df in results.items()
+            },
+            "errors": errors
+        })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    finally:
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+# ---------------- Prediction Job Routes ----------------
+def _set_job_status(job_id, from_statuses, **values):
+    # Conditional UPDATE so a cancel and a worker can never both win
+    updated = PredictJob.query.filter(
+        PredictJob.id == job_id,
+        PredictJob.status.in_(from_statuses)
+    ).update(values, synchronize_session=False)
+    db.session.commit()
+    return updated == 1
+
+
+def run_predict_job(job_id):
+    with app.app_context():
+        job = db.session.get(PredictJob, job_id)
+
+        if job is None:
+            return
+
+        file_path = job.file_path
+        state_key = job.warehouse_code
+        source_name = job.source_name
+
+        try:
+            if not _set_job_status(job_id, ["queued"], status="running", started_at=datetime.utcnow()):
+                return
+
+            try:
+                pred_df = predict_stockout(file_path, state_key=state_key, source_name=source_name)
+
+                if pred_df is None or pred_df.empty:
+                    raise ValueError("Prediction result is empty")
+
+                # Kept columnar so result pages are streamed from disk
+                pred_df.reset_index(drop=True).to_feather(_job_result_path(job_id))
+
+                finished = _set_job_status(
+                    job_id, ["running"],
+                    status="done",
+                    total_rows=len(pred_df),
+                    finished_at=datetime.utcnow()
+                )
+
+            except Exception as e:
+                db.session.rollback()
+                finished = _set_job_status(
+                    job_id, ["running"],
+                    status="failed",
+                    error=str(e),
+                    finished_at=datetime.utcnow()
+                )
+
+            # Cancelled while running: the work is done, the result is dropped
+            if not finished:
+                if os.path.exists(_job_result_path(job_id)):
+                    os.remove(_job_result_path(job_id))
+                _set_job_status(
+                    job_id, ["cancelling"],
+                    status="cancelled",
+                    finished_at=datetime.utcnow()
+                )
+
+        finally:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+
+def _job_result_path(job_id):
+    return os.path.join(JOB_DIR, f"{job_id}.result.feather")
+
+
+def _sweep_predict_jobs():
+    # Fails jobs whose worker is gone, then drops expired files in JOB_DIR
+    now = datetime.utcnow()
+    deadline = now - timedelta(seconds=JOB_TIMEOUT_SECONDS)
+    error = "Job did not finish in time (worker lost or restarted)"
+
+    PredictJob.query.filter(
+        PredictJob.status == "queued",
+        PredictJob.created_at < deadline
+    ).update({"status": "failed", "error": error, "finished_at": now}, synchronize_session=False)
+
+    PredictJob.query.filter(
+        PredictJob.status.in_(["running", "cancelling"]),
+        PredictJob.started_at < deadline
+    ).update({"status": "failed", "error": error, "finished_at": now}, synchronize_session=False)
+
+    db.session.commit()
+
+    if not os.path.isdir(JOB_DIR):
+        return
+
+    now_ts = time.time()
+
+    with os.scandir(JOB_DIR) as it:
+        for entry in it:
+            # Uploads outlive their job only if its worker was lost
+            ttl = JOB_RETENTION_SECONDS if entry.name.endswith(".result.feather") else JOB_TIMEOUT_SECONDS
+
+            try:
+                if now_ts - entry.stat().st_mtime > ttl:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def _job_status(job):
+    queue_seconds = run_seconds = None
+
+    if job.started_at:
+        queue_seconds = (job.started_at - job.created_at).total_seconds()
+        if job.finished_at:
+            run_seconds = (job.finished_at - job.started_at).total_seconds()
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "warehouse_code": job.warehouse_code,
+        "total_rows": job.total_rows,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "queue_seconds": queue_seconds,
+        "run_seconds": run_seconds
+    }
+
+
+@app.route('/predict-jobs', methods=['POST'])
+def submit_predict_job():
+
+    if 'file' not in request.files:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    _sweep_predict_jobs()
+
+    pending = PredictJob.query.filter(
+        PredictJob.status.in_(["queued", "running", "cancelling"])
+    ).count()
+
+    if pending >= JOB_QUEUE_LIMIT:
+        response = jsonify({"error": "Prediction queue is full, retry later"})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+
+    job_id = uuid.uuid4().hex
+    os.makedirs(JOB_DIR, exist_ok=True)
+    file_path = os.path.join(JOB_DIR, f"{job_id}.xlsx")
+    request.files['file'].save(file_path)
+
+    job = PredictJob(
+        id=job_id,
+        warehouse_code=request.form.get("warehouse_code") or None,
+        file_path=file_path,
+        source_name=request.files['file'].filename or None
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    job_executor.submit(run_predict_job, job_id)
+
+    return jsonify({"job_id": job_id, "status": job.status}), 202
+
+
+@app.route('/predict-jobs/<job_id>', methods=['GET'])
+def get_predict_job(job_id):
+    job = db.session.get(PredictJob, job_id)
+
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify(_job_status(job))
+
+
+@app.route('/predict-jobs/<job_id>/result', methods=['GET'])
+def get_predict_job_result(job_id):
+    job = db.session.get(PredictJob, job_id)
+
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    if job.status == "done":
+        try:
+            pred_df = pd.read_feather(_job_result_path(job_id))
+        except FileNotFoundError:
+            return jsonify({"error": "Job result has expired"}), 410
+
+        return _stream_result(pred_df, cursor=request.args.get("cursor"))
+
+    if job.status == "failed":
+        return jsonify({"error": job.error}), 500
+
+    if job.status == "cancelled":
+        return jsonify({"error": "Job was cancelled"}), 409
+
+    return jsonify(_job_status(job)), 202
+
+
+@app.route('/predict-jobs/<job_id>', methods=['DELETE'])
+def cancel_predict_job(job_id):
+    job = db.session.get(PredictJob, job_id)
+
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    # Queued jobs never start; running ones finish but keep no result
+    if not _set_job_status(job_id, ["queued"], status="cancelled", finished_at=datetime.utcnow()):
+        _set_job_status(job_id, ["running"], status="cancelling")
+
+    db.session.refresh(job)
+    return jsonify(_job_status(job))
+
+
+# Jobs orphaned by the previous process are failed once they time out
+with app.app_context():
+    _sweep_predict_jobs()
+
 # ---------------- Product Dashboard Route ----------------
 
 from datetime import datetime, timedelta
@@ -310,78 +865,121 @@ from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
 
-@app.route("/product-dashboard/<int:product_id>", methods=["GET"])
-def product_dashboard(product_id):
+DASHBOARD_DATASET_PATH = "proper_blinkit_dataset.xlsx"
+# Look-ahead for the dashboard's upcoming festivals list
+DASHBOARD_FESTIVAL_DAYS = 30
+
+
+# Held while the ProductForecast table is rebuilt, so concurrent cold
+# dashboard requests wait for one rebuild instead of each running their own
+_forecast_lock = threading.Lock()
+
+
+def _forecasts_current(sha256, today):
+    return db.session.query(ProductForecast.product_id).filter_by(
+        dataset_sha256=sha256,
+        computed_on=today
+    ).first() is not None
+
+
+def refresh_product_forecasts(dataset_path):
+    # Rebuilds the ProductForecast table when the dataset content or the
+    # day changed; a no-op (one indexed read) when it is already current
+    sha256 = dataset_sha256(dataset_path)
+    today = date.today()
+
+    if _forecasts_current(sha256, today):
+        return False
+
+    with _forecast_lock:
+        # End the read transaction, so the re-check sees a rebuild another
+        # request committed while this one waited
+        db.session.rollback()
+
+        if _forecasts_current(sha256, today):
+            return False
+
+        _rebuild_product_forecasts(dataset_path, sha256, today)
+
+    return True
+
+
+def _rebuild_product_forecasts(dataset_path, sha256, today):
+    forecast_df = forecast_products(
+        get_features(dataset_path, sha256=sha256),
+        today=today
+    )
+    forecast_df["dataset_sha256"] = sha256
+    forecast_df["computed_on"] = today
+
+    records = forecast_df.astype(object).where(forecast_df.notna(), None).to_dict(orient="records")
 
+    # DELETE and INSERT commit as one transaction: readers see either the
+    # old table or the new one, never a half-filled one
     try:
-        DATASET_PATH = "proper_blinkit_dataset.xlsx"
+        ProductForecast.query.delete()
+        db.session.execute(insert(ProductForecast), records)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
 
-        pipeline_output = build_pipeline(DATASET_PATH)
-        aggregated_df = pipeline_output["aggregated"]
 
-        product_row = aggregated_df[
-            aggregated_df["product_id"] == product_id
-        ]
+@app.route("/product-dashboard/<int:product_id>", methods=["GET"])
+def product_dashboard(product_id):
 
-        if product_row.empty:
-            return jsonify({"error": "Product not found"}), 404
+    try:
+        # Precomputed by one bulk prediction per dataset version and day
+        refresh_product_forecasts(DASHBOARD_DATASET_PATH)
 
-        product_row = product_row.iloc[0]
+        forecast = db.session.get(ProductForecast, product_id)
 
-        # ---------- Prediction (SAME as /predict) ----------
-        features = [
-            "avg_daily_sales",
-            "sales_volatility",
-            "festival_score",
-            "festival_electronics_boost",
-            "net_stock"
-        ]
+        if forecast is None:
+            return jsonify({"error": "Product not found"}), 404
 
-        X = pd.DataFrame([product_row[features]])
+        days_left = forecast.days_left
+        stock_status = forecast.stock_status
+        predicted_stockout_date = forecast.stockout_date.strftime("%Y-%m-%d")
 
-        predicted_30_day_demand = model.predict(X)[0]
-        predicted_daily_demand = max(predicted_30_day_demand / 30, 0.1)
+        # ---------- Sales history ----------
+        # ?start=YYYY-MM-DD&end=YYYY-MM-DD&freq=day|week|month; defaults
+        # to the last 30 days of the dataset, per day
+        freq = request.args.get("freq", "day")
 
-        net_stock = float(product_row["net_stock"])
+        if freq not in FREQUENCIES:
+            return jsonify({"error": f"freq must be one of {', '.join(FREQUENCIES)}"}), 400
 
-        days_left = int(net_stock / predicted_daily_demand)
+        try:
+            start = parse_day(request.args.get("start"))
+            end = parse_day(request.args.get("end"))
+        except ValueError:
+            return jsonify({"error": "start/end must be dates (YYYY-MM-DD)"}), 400
 
-        today = datetime.today().date()
-        predicted_stockout_date = (
-            today + timedelta(days=days_left)
-        ).strftime("%Y-%m-%d")
+        # Same feature store snapshot the forecast table was built from
+        series = get_series_store(DASHBOARD_DATASET_PATH)
 
-        # ---------- Stock Status ----------
-        if days_left < 7:
-            stock_status = "Understock"
-        elif days_left > 60:
-            stock_status = "Overstock"
-        else:
-            stock_status = "Fine"
+        if end is None:
+            end = series.last_day
 
-        # ---------- Generate 30-day visual trend ----------
-        avg_daily = float(product_row["avg_daily_sales"])
+        if start is None and end is not None:
+            start = end - np.timedelta64(29, "D")
 
-        historical_data = []
+        historical_data = series.query(product_id, start, end, freq) or []
 
-        for i in range(30):
-            date = today - timedelta(days=29 - i)
-            quantity = max(avg_daily + np.random.randint(-5, 6), 0)
+        avg_daily = forecast.avg_daily_sales
 
-            historical_data.append({
-                "date": date.strftime("%Y-%m-%d"),
-                "quantity": float(quantity)
-            })
+        upcoming_festivals = get_calendar().upcoming(date.today(), DASHBOARD_FESTIVAL_DAYS)
 
         return jsonify({
             "product_id": int(product_id),
-            "product_name": product_row["product_name"],
-            "category": product_row["category"],
+            "product_name": forecast.product_name,
+            "category": forecast.category,
             "avg_daily_sales": avg_daily,
             "days_left": days_left,
             "stock_status": stock_status,
             "predicted_stockout_date": predicted_stockout_date,
-            "historical_data": historical_data
+            "historical_data": historical_data,
+            "upcoming_festivals": upcoming_festivals
         })
 
     except Exception as e:
@@ -395,7 +993,7 @@ def test_email():
         "Test Email",
         "If you received this, SMTP is working."
     )
-    return "Email sent"
+    return "Email queued"
 
 # ---------------- Chatbot Route ----------------
 @app.route('/chat', methods=['POST'])
@@ -417,156 +1015,297 @@ def chat():
 
 
 
-def send_email(to_email, subject, body):
-    print("📨 Attempting to send email...")
-    print("To:", to_email)
-    print("From:", os.getenv("EMAIL_USER"))
+# ---------------- Email Outbox ----------------
+_outbox_wakeup = threading.Event()
+_smtp_local = threading.local()
+
+
+def send_email(to_email, subject, body, commit=True):
+    # Queues the message in the outbox; delivery happens on the outbox
+    # pool. With commit=False the caller commits it together with its
+    # own changes and then calls wake_outbox().
+    db.session.add(EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        body=body
+    ))
+
+    if commit:
+        db.session.commit()
+        wake_outbox()
+
+    print("📨 Email queued for:", to_email)
+
+
+def wake_outbox():
+    _outbox_wakeup.set()
+
 
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = os.getenv("EMAIL_USER")
-    msg["To"] = to_email
+def _close_smtp():
+    server = getattr(_smtp_local, "server", None)
+    _smtp_local.server = None
 
+    if server is not None:
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+
+def _smtp_connection():
+    # One connection per pool thread, kept open between messages
+    server = getattr(_smtp_local, "server", None)
+
+    if server is None:
+        if SMTP_SSL:
+            server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        else:
+            server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+
+        if os.getenv("EMAIL_USER") and os.getenv("EMAIL_PASS"):
+            server.login(os.getenv("EMAIL_USER"), os.getenv("EMAIL_PASS"))
+
+        _smtp_local.server = server
+
+    return server
+
+
+def _smtp_send(msg):
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(
-                os.getenv("EMAIL_USER"),
-                os.getenv("EMAIL_PASS")
-            )
-            server.send_message(msg)
+        _smtp_connection().send_message(msg)
+    except smtplib.SMTPServerDisconnected:
+        # Idle connection dropped by the server: reconnect once
+        _close_smtp()
+        _smtp_connection().send_message(msg)
 
-        print("✅ Email sent successfully")
 
-    except Exception as e:
-        print("❌ Email failed:", str(e))
+def _deliver_message(message_id):
+    with app.app_context():
+        message = db.session.get(EmailOutbox, message_id)
 
-from datetime import date, timedelta
-from collections import defaultdict
+        if message is None:
+            return
 
-from collections import defaultdict
-from datetime import date
+        msg = MIMEText(message.body)
+        msg["Subject"] = message.subject
+        msg["From"] = os.getenv("EMAIL_USER")
+        msg["To"] = message.to_email
 
-def check_and_send_reminders():
-    today = date.today()
-    print("📅 Running reminder check for:", today)
+        message.attempts += 1
+        start = time.perf_counter()
 
-    reminders = StockoutReminder.query.all()
-    # print("🔔 Total reminders:", len(reminders))
+        try:
+            _smtp_send(msg)
 
-    # 🔹 Group emails
-    stage_stockout = defaultdict(list)
-    stage_2_days = defaultdict(list)
-    stage_1_day = defaultdict(list)
-    stage_today = defaultdict(list)
+            message.status = "sent"
+            message.sent_at = datetime.utcnow()
+            message.latency_ms = (time.perf_counter() - start) * 1000
+            message.last_error = None
 
-    for r in reminders:
-        days_left = (r.stockout_date - today).days
+            print("✅ Email sent successfully to:", message.to_email)
 
-        if days_left == 2:
-            stage_2_days[r.email].append(r)
+        except Exception as e:
+            # Drop the connection; the next message opens a fresh one
+            _close_smtp()
+            message.last_error = str(e)
 
-        elif days_left == 1:
-            stage_1_day[r.email].append(r)
+            if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+                message.status = "failed"
+            else:
+                backoff = min(OUTBOX_BACKOFF_SECONDS * 2 ** (message.attempts - 1), 3600)
+                message.status = "pending"
+                message.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff)
 
-        elif days_left == 0:
-            stage_today[r.email].append(r)
+            print("❌ Email failed:", str(e))
 
-        elif days_left < 0:
-            stage_stockout[r.email].append(r)
+        db.session.commit()
 
-    # 🔔 SEND 2-DAY MAILS
-    for email, items in stage_2_days.items():
-        product_list = "\n".join(f"• {r.product_name}" for r in items)
 
-        send_email(
-            email,
-            "Upcoming Stockout Alert (2 Days Left)",
-            f"""
-Hello,
+def _claim_outbox_batch(limit):
+    # Due messages (or expired leases) moved to "sending" with a
+    # conditional UPDATE each, so concurrent dispatchers never share one
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
 
-The following product(s) are expected to run out of stock in 2 days:
+    candidates = [
+        message_id for (message_id,) in db.session.query(EmailOutbox.id).filter(
+            EmailOutbox.status.in_(["pending", "sending"]),
+            EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.next_attempt_at).limit(limit)
+    ]
 
-{product_list}
+    claimed = []
 
-Please plan inventory accordingly.
+    for message_id in candidates:
+        updated = EmailOutbox.query.filter(
+            EmailOutbox.id == message_id,
+            EmailOutbox.status.in_(["pending", "sending"]),
+            EmailOutbox.next_attempt_at <= now
+        ).update({
+            "status": "sending",
+            "next_attempt_at": lease_until
+        }, synchronize_session=False)
 
-– InventOPredict Team
-"""
-        )
+        if updated:
+            claimed.append(message_id)
 
-        for r in items:
-            r.reminder_stage = 1
+    db.session.commit()
+    return claimed
 
-    # 🔔 SEND 1-DAY MAILS
-    for email, items in stage_1_day.items():
-        product_list = "\n".join(f"• {r.product_name}" for r in items)
 
-        send_email(
-            email,
-            "Stockout Alert (1 Day Left)",
-            f"""
-Hello,
+def _outbox_dispatcher():
+    batch_size = OUTBOX_POOL_SIZE * 4
 
-The following product(s) are expected to run out of stock tomorrow:
+    while True:
+        _outbox_wakeup.wait(OUTBOX_POLL_SECONDS)
+        _outbox_wakeup.clear()
 
-{product_list}
+        try:
+            with app.app_context():
+                claimed = _claim_outbox_batch(batch_size)
 
-Immediate action is recommended.
+            wait([outbox_executor.submit(_deliver_message, mid) for mid in claimed])
 
-– InventOPredict Team
-"""
-        )
+            # A full batch means more may be waiting
+            if len(claimed) == batch_size:
+                _outbox_wakeup.set()
 
-        for r in items:
-            r.reminder_stage = 2
+        except Exception as e:
+            print("❌ Outbox dispatcher error:", str(e))
 
-    # 🔔 SEND TODAY MAILS + DELETE
-    for email, items in stage_today.items():
-        product_list = "\n".join(f"• {r.product_name}" for r in items)
 
-        send_email(
-            email,
-            "Stockout Alert (Today)",
-            f"""
-Hello,
+def start_outbox_worker():
+    thread = threading.Thread(target=_outbox_dispatcher, name="email-outbox", daemon=True)
+    thread.start()
+    return thread
 
-The following product(s) are expected to run out of stock today:
 
-{product_list}
+@app.cli.command("outbox-worker")
+def outbox_worker_command():
+    # Delivers queued email in the foreground until interrupted
+    print("📨 Outbox worker started")
+    _outbox_dispatcher()
 
-Please take urgent action.
 
-– InventOPredict Team
-"""
+if os.getenv("OUTBOX_WORKER", "0") == "1":
+    start_outbox_worker()
+
+from datetime import date, timedelta
+from collections import defaultdict
+
+# Recipients handled per batch by the reminder job
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+
+
+def _process_reminder_stage(condition, subject, intro, closing, next_stage=None):
+    # Mails every recipient with reminders matching `condition`, one batch
+    # of recipients at a time (keyset-paginated on email), then either moves
+    # those reminders to `next_stage` or deletes them with one statement.
+    last_email = None
+    sent = 0
+
+    while True:
+        recipients = db.session.query(StockoutReminder.email).filter(condition)
+
+        if last_email is not None:
+            recipients = recipients.filter(StockoutReminder.email > last_email)
+
+        emails = [
+            email for (email,) in recipients
+            .group_by(StockoutReminder.email)
+            .order_by(StockoutReminder.email)
+            .limit(REMINDER_BATCH_SIZE)
+        ]
+
+        if not emails:
+            return sent
+
+        batch = StockoutReminder.query.filter(
+            condition,
+            StockoutReminder.email.in_(emails)
         )
 
-        for r in items:
-            db.session.delete(r)
+        products = defaultdict(list)
+        for email, product_name in batch.with_entities(
+            StockoutReminder.email,
+            StockoutReminder.product_name
+        ).order_by(StockoutReminder.id):
+            products[email].append(product_name)
 
-        # 🔔 SEND ALREADY STOCKOUT MAIL + DELETE
-    for email, items in stage_stockout.items():
-        product_list = "\n".join(f"• {r.product_name}" for r in items)
+        for email in emails:
+            product_list = "\n".join(f"• {name}" for name in products[email])
 
-        send_email(
-            email,
-            "Already Stockout Alert",
-            f"""
+            send_email(
+                email,
+                subject,
+                f"""
 Hello,
 
-The following product(s) are already out of stock :
+{intro}
 
 {product_list}
 
-Please take urgent action.
+{closing}
 
 – InventOPredict Team
-"""
-        )
+""",
+                commit=False
+            )
+
+        # Mails are queued in the same transaction that advances the rows
+        if next_stage is None:
+            batch.delete(synchronize_session=False)
+        else:
+            batch.update({"reminder_stage": next_stage}, synchronize_session=False)
+
+        db.session.commit()
+        wake_outbox()
+
+        sent += len(emails)
+        last_email = emails[-1]
+
+
+def check_and_send_reminders():
+    today = date.today()
+    print("📅 Running reminder check for:", today)
+
+    stockout_date = StockoutReminder.stockout_date
+    reminder_stage = db.func.coalesce(StockoutReminder.reminder_stage, 0)
+
+    # 🔔 SEND 2-DAY MAILS
+    _process_reminder_stage(
+        db.and_(stockout_date == today + timedelta(days=2), reminder_stage < 1),
+        "Upcoming Stockout Alert (2 Days Left)",
+        "The following product(s) are expected to run out of stock in 2 days:",
+        "Please plan inventory accordingly.",
+        next_stage=1
+    )
+
+    # 🔔 SEND 1-DAY MAILS
+    _process_reminder_stage(
+        db.and_(stockout_date == today + timedelta(days=1), reminder_stage < 2),
+        "Stockout Alert (1 Day Left)",
+        "The following product(s) are expected to run out of stock tomorrow:",
+        "Immediate action is recommended.",
+        next_stage=2
+    )
+
+    # 🔔 SEND TODAY MAILS + DELETE
+    _process_reminder_stage(
+        stockout_date == today,
+        "Stockout Alert (Today)",
+        "The following product(s) are expected to run out of stock today:",
+        "Please take urgent action."
+    )
+
+    # 🔔 SEND ALREADY STOCKOUT MAIL + DELETE
+    _process_reminder_stage(
+        stockout_date < today,
+        "Already Stockout Alert",
+        "The following product(s) are already out of stock :",
+        "Please take urgent action."
+    )
 
-        for r in items:
-            db.session.delete(r)
-            
-    db.session.commit()
     print("✅ Reminder cycle completed")
 
 
@@ -600,5 +1339,9 @@ def clear_reminders_route():
 # http://127.0.0.1:5000/clear-reminders(clear the table)
 # ---------------- Run App ----------------
 if __name__ == '__main__':
+    # The development server delivers its own mail unless OUTBOX_WORKER=0
+    if os.getenv("OUTBOX_WORKER") is None:
+        start_outbox_worker()
+
     port = int(os.environ.get("PORT", 10000))
     app.run(host="0.0.0.0", port=port)
\ No newline at end of file
@@ -0,0 +1,116 @@
+import io
+import os
+import time
+import tempfile
+import statistics
+from model import result_cache
+from model.feature_store import get_features
+
+# Flask test-client load runs for the /predict and /product-dashboard hot
+# paths. The app is pointed at a throwaway SQLite database and the outbox
+# worker is disabled, so a run never touches instance/site.db or sends mail.
+
+
+def _latency_stats(timings):
+    ordered = sorted(timings)
+    total = sum(ordered)
+
+    return {
+        "requests": len(ordered),
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000,
+        "max_ms": ordered[-1] * 1000,
+        "requests_per_s": len(ordered) / total if total else None
+    }
+
+
+def _load_app():
+    os.environ.setdefault(
+        "DATABASE_URL",
+        "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bench_db_"), "bench.db")
+    )
+
+    import app as app_module
+
+    # Cleared between requests, so never the real instance/result_cache
+    result_cache.CACHE_DIR = tempfile.mkdtemp(prefix="bench_result_cache_")
+    return app_module
+
+
+def run(dataset_path, requests=20):
+    if not dataset_path.endswith(".xlsx"):
+        raise ValueError("API benchmarks need an .xlsx dataset (uploaded to /predict).")
+
+    app_module = _load_app()
+    app_module.DASHBOARD_DATASET_PATH = dataset_path
+    client = app_module.app.test_client()
+
+    with open(dataset_path, "rb") as f:
+        workbook = f.read()
+
+    results = {}
+
+    # ---------- /predict ----------
+    # The same workbook is posted every time, so the result cache is
+    # cleared before each request to time the model path; cache hits are
+    # timed separately below
+    timings = []
+    for _ in range(requests):
+        result_cache.clear_result_cache()
+        start = time.perf_counter()
+        response = client.post(
+            "/predict",
+            data={"file": (io.BytesIO(workbook), "bench.xlsx")},
+            content_type="multipart/form-data"
+        )
+        # The body is streamed, so reading it is part of the request
+        body = response.get_data()
+        response.close()
+        timings.append(time.perf_counter() - start)
+
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict returned {response.status_code}: {body.decode()}")
+
+    results["predict"] = _latency_stats(timings)
+
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.post(
+            "/predict",
+            data={"file": (io.BytesIO(workbook), "bench.xlsx")},
+            content_type="multipart/form-data"
+        )
+        body = response.get_data()
+        response.close()
+        timings.append(time.perf_counter() - start)
+
+        if response.headers.get("X-Result-Cache") != "hit":
+            raise RuntimeError(f"/predict missed the result cache: {response.status_code} {body[:200]!r}")
+
+    results["predict_cached"] = _latency_stats(timings)
+
+    # ---------- /product-dashboard ----------
+    product_ids = get_features(dataset_path)["product_id"].tolist()
+
+    # First hit builds the forecast table (the features are already stored)
+    start = time.perf_counter()
+    client.get(f"/product-dashboard/{int(product_ids[0])}")
+    cold = time.perf_counter() - start
+
+    timings = []
+    for i in range(requests * 10):
+        product_id = int(product_ids[i % len(product_ids)])
+        start = time.perf_counter()
+        response = client.get(f"/product-dashboard/{product_id}")
+        body = response.get_data()
+        response.close()
+        timings.append(time.perf_counter() - start)
+
+        if response.status_code != 200:
+            raise RuntimeError(f"/product-dashboard returned {response.status_code}: {body.decode()}")
+
+    results["product_dashboard"] = dict(_latency_stats(timings), cold_ms=cold * 1000)
+
+    return results
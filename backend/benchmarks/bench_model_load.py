@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import subprocess
+
+# Cold-start time and resident memory of loading the demand model, per
+# serving format. Each format is loaded in a fresh interpreter so imports
+# and allocator state from one run do not leak into the next.
+#
+#   cd backend && python -m benchmarks.bench_model_load
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+_CHILD = r"""
+import json, os, resource, sys, time
+import numpy as np
+import xgboost as xgb
+import joblib
+
+fmt, path = sys.argv[1], sys.argv[2]
+
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+
+if fmt == "pickle":
+    model = joblib.load(path)
+else:
+    model = xgb.XGBRegressor()
+    model.load_model(path)
+
+load_s = time.perf_counter() - start
+
+X = np.zeros((1, model.n_features_in_), dtype=np.float32)
+start = time.perf_counter()
+model.predict(X)
+first_predict_s = time.perf_counter() - start
+
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+print(json.dumps({
+    "load_s": load_s,
+    "first_predict_s": first_predict_s,
+    "rss_delta_mb": (rss_after - rss_before) / 1024
+}))
+"""
+
+
+def _run(fmt, path):
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, fmt, path],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run(repeat=3):
+    # Best (fastest load) of `repeat` cold loads per format found on disk
+    from model.model_registry import MODEL_PATH, NATIVE_MODEL_PATH
+
+    formats = [("pickle", MODEL_PATH), ("ubj", NATIVE_MODEL_PATH)]
+    results = {}
+
+    for fmt, path in formats:
+        if not os.path.exists(path):
+            print(f"{fmt:>7}: {path} not found, skipped")
+            continue
+
+        runs = [_run(fmt, path) for _ in range(repeat)]
+        best = min(runs, key=lambda r: r["load_s"])
+        results[fmt] = dict(best, file_kb=os.path.getsize(path) / 1024)
+
+    return results
+
+
+def main(repeat=3):
+    for fmt, best in run(repeat).items():
+        print(
+            f"{fmt:>7}: load {best['load_s'] * 1000:8.1f} ms  "
+            f"first predict {best['first_predict_s'] * 1000:6.1f} ms  "
+            f"RSS +{best['rss_delta_mb']:.1f} MB  "
+            f"file {best['file_kb']:.0f} KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
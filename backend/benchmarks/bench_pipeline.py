@@ -0,0 +1,127 @@
+import gc
+import json
+import time
+import tempfile
+import tracemalloc
+import statistics
+
+from model import ingest, pipeline, feature_store
+from model.pipeline import ProductAggregates, build_pipeline, _order_lines
+from model.festival_calendar import get_calendar
+from model.predict import FEATURES, predict_stockout
+from model.model_registry import get_model
+
+# Per-stage timings and peak traced memory for the pipeline and prediction
+# path. Stages mirror the steps inside build_pipeline/predict_stockout so a
+# regression can be pinned to one of them.
+
+
+def measure(fn, repeat=3):
+    # Timed runs untraced (tracemalloc slows allocation-heavy code), then
+    # one traced run for the peak of Python + numpy allocations
+    timings = []
+    result = None
+
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, {
+        "seconds_min": min(timings),
+        "seconds_median": statistics.median(timings),
+        "peak_mb": peak / (1 << 20)
+    }
+
+
+def run(dataset_path, festival_path, repeat=3):
+    stages = {}
+
+    # The sheet cache, feature store and festival calendar point at
+    # benchmark-owned files
+    pipeline.FESTIVAL_PATH = festival_path
+    ingest.CACHE_DIR = tempfile.mkdtemp(prefix="bench_sheet_cache_")
+    feature_store.STORE_DIR = tempfile.mkdtemp(prefix="bench_feature_store_")
+
+    def load_cold():
+        ingest.CACHE_DIR = tempfile.mkdtemp(prefix="bench_sheet_cache_")
+        return ingest.load_sheets(dataset_path)
+
+    _, stages["load_cold"] = measure(load_cold, repeat=1)
+    sheets, stages["load_warm"] = measure(lambda: ingest.load_sheets(dataset_path), repeat)
+
+    calendar = get_calendar(festival_path)
+    products = sheets["blinkit_products"]
+
+    # The steps ProductAggregates runs inside build_pipeline: the array
+    # join, festival scoring, folding joined lines, inventory and finalize
+    items, orders = sheets["blinkit_order_items"], sheets["blinkit_orders"]
+
+    lines, stages["order_lines"] = measure(
+        lambda: _order_lines(items, orders, products, calendar), repeat
+    )
+    _, stages["festival_features"] = measure(lambda: calendar.scores(lines[1]), repeat)
+
+    def add_lines():
+        aggregates = ProductAggregates()
+        aggregates.add_lines(*lines, calendar)
+        return aggregates
+
+    folded, stages["add_lines"] = measure(add_lines, repeat)
+
+    _, stages["inventory"] = measure(
+        lambda: ProductAggregates().add_inventory(sheets["blinkit_inventory"]), repeat
+    )
+    folded.add_inventory(sheets["blinkit_inventory"])
+
+    _, stages["finalize"] = measure(lambda: folded.finalize(products), repeat)
+
+    def aggregate():
+        aggregates = ProductAggregates()
+        aggregates.add_order_items(
+            sheets["blinkit_order_items"], sheets["blinkit_orders"], products, calendar
+        )
+        aggregates.add_inventory(sheets["blinkit_inventory"])
+        return aggregates.finalize(products)
+
+    _, stages["aggregate"] = measure(aggregate, repeat)
+
+    output, stages["build_pipeline"] = measure(lambda: build_pipeline(dataset_path), repeat)
+
+    def features_cold():
+        feature_store.clear_feature_store(disk=True)
+        return feature_store.get_features(dataset_path)
+
+    def features_disk():
+        feature_store.clear_feature_store()
+        return feature_store.get_features(dataset_path)
+
+    # Pipeline + snapshot write, snapshot read, and in-process hit
+    _, stages["features_cold"] = measure(features_cold, repeat)
+    _, stages["features_disk"] = measure(features_disk, repeat)
+    _, stages["features_warm"] = measure(lambda: feature_store.get_features(dataset_path), repeat)
+
+    X = output["aggregated"][FEATURES].fillna(0)
+    model = get_model()
+    _, stages["prediction"] = measure(lambda: model.predict(X), repeat)
+
+    result, stages["predict_stockout"] = measure(lambda: predict_stockout(dataset_path), repeat)
+
+    _, stages["serialization"] = measure(
+        lambda: json.dumps(result.to_dict(orient="records"), default=str), repeat
+    )
+
+    return {
+        "rows": {sheet: len(df) for sheet, df in sheets.items()},
+        "products_out": len(output["aggregated"]),
+        "stages": stages
+    }
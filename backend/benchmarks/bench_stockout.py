@@ -0,0 +1,74 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Micro-benchmark of the shared stockout kernel against the pandas
+# to_timedelta/astype(str) version /predict used before, on synthetic
+# demand and stock arrays (no model, no pipeline).
+#
+#   cd backend && python -m benchmarks.bench_stockout --rows 1000000
+
+from model.stockout import stockout_kernel, status_labels, format_dates
+
+
+def _pandas_reference(predicted, net_stock):
+    daily = np.maximum(predicted / 30, 0.1)
+    days_left = (pd.Series(net_stock) / daily).clip(lower=0).astype(int)
+    stockout_date = pd.Timestamp.today().normalize() + pd.to_timedelta(days_left, unit="D")
+    status = np.select([days_left < 7, days_left > 60], ["Understock", "Overstock"], default="Fine")
+    return days_left, stockout_date.astype(str), status
+
+
+def _kernel(predicted, net_stock):
+    return stockout_kernel(predicted, net_stock)
+
+
+def _kernel_with_labels(predicted, net_stock):
+    _, days_left, stockout_day, status = stockout_kernel(predicted, net_stock)
+    return days_left, format_dates(stockout_day), status_labels(status)
+
+
+def _best(fn, args, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+CASES = {
+    "pandas_reference": ("pandas (previous /predict)", _pandas_reference),
+    "kernel": ("kernel (int-encoded)", _kernel),
+    "kernel_with_labels": ("kernel + date strings/labels", _kernel_with_labels)
+}
+
+
+def run(rows=1_000_000, repeat=5):
+    rng = np.random.default_rng(0)
+    predicted = rng.gamma(2.0, 40.0, rows)
+    net_stock = rng.integers(-50, 2_000, rows).astype(np.float64)
+
+    results = {}
+
+    for key, (_, fn) in CASES.items():
+        seconds = _best(fn, (predicted, net_stock), repeat)
+        results[key] = {"seconds_min": seconds, "rows": rows}
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the stockout kernel")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for key, stats in run(args.rows, args.repeat).items():
+        seconds = stats["seconds_min"]
+        print(f"{CASES[key][0]:<30} {seconds * 1000:9.1f} ms  {args.rows / seconds / 1e6:7.1f} M rows/s")
+
+
+if __name__ == "__main__":
+    main()
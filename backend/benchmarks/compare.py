@@ -0,0 +1,78 @@
+import sys
+import json
+import argparse
+
+# Diffs two benchmarks/run.py result files. Exits 1 when any timing got
+# slower than --threshold (default 10%), so it can gate CI.
+#
+#   python -m benchmarks.compare before.json after.json
+
+
+def _metrics(results):
+    metrics = {}
+
+    for name, stage in results.get("pipeline", {}).get("stages", {}).items():
+        metrics[f"pipeline.{name}.seconds"] = stage["seconds_min"]
+        metrics[f"pipeline.{name}.peak_mb"] = stage["peak_mb"]
+
+    for name, stats in results.get("stockout", {}).items():
+        metrics[f"stockout.{name}.seconds"] = stats["seconds_min"]
+
+    for fmt, stats in results.get("model_load", {}).items():
+        metrics[f"model_load.{fmt}.load_s"] = stats["load_s"]
+        metrics[f"model_load.{fmt}.first_predict_s"] = stats["first_predict_s"]
+        metrics[f"model_load.{fmt}.rss_delta_mb"] = stats["rss_delta_mb"]
+
+    for name, stats in results.get("api", {}).items():
+        metrics[f"api.{name}.p50_ms"] = stats["p50_ms"]
+        metrics[f"api.{name}.p95_ms"] = stats["p95_ms"]
+
+    if "peak_rss_mb" in results:
+        metrics["peak_rss_mb"] = results["peak_rss_mb"]
+
+    return metrics
+
+
+def compare(before, after, threshold=0.10):
+    old, new = _metrics(before), _metrics(after)
+    regressions = []
+
+    print(f"{'metric':<40} {'before':>12} {'after':>12} {'change':>9}")
+
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        change = (b - a) / a if a else 0.0
+        flag = ""
+
+        if change > threshold:
+            flag = "  ⚠️"
+            regressions.append(key)
+
+        print(f"{key:<40} {a:>12.4f} {b:>12.4f} {change:>+8.1%}{flag}")
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    regressions = compare(before, after, args.threshold)
+
+    if regressions:
+        print(f"❌ {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+    print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
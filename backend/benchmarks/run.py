@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime
+
+from . import bench_pipeline, bench_api, bench_model_load, bench_stockout
+from .synthetic import write_dataset
+
+# Benchmark entry point. Generates a synthetic dataset, runs the pipeline
+# stage benchmarks, the stockout kernel and model load benchmarks and the
+# Flask load runs, and writes one JSON document
+# that benchmarks/compare.py can diff against a run from another commit.
+#
+#   cd backend
+#   python -m benchmarks.run --order-lines 200000 --output before.json
+#   (switch commits)
+#   python -m benchmarks.run --order-lines 200000 --output after.json
+#   python -m benchmarks.compare before.json after.json
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="InventOPredict benchmarks")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--order-lines", type=int, default=200_000)
+    parser.add_argument("--festival-density", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["xlsx", "parquet", "csv"], default="xlsx")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--stockout-rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-api", action="store_true")
+    parser.add_argument("--output", default="bench_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    work_dir = tempfile.mkdtemp(prefix="bench_dataset_")
+
+    params = {
+        "products": args.products,
+        "days": args.days,
+        "order_lines": args.order_lines,
+        "festival_density": args.festival_density,
+        "seed": args.seed
+    }
+
+    try:
+        dataset_path, festival_path = write_dataset(work_dir, fmt=args.format, **params)
+
+        results = {
+            "meta": {
+                "commit": _git_commit(),
+                "timestamp": datetime.utcnow().isoformat(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "dataset": dict(params, format=args.format),
+                "repeat": args.repeat
+            },
+            "pipeline": bench_pipeline.run(dataset_path, festival_path, repeat=args.repeat),
+            "stockout": bench_stockout.run(args.stockout_rows, repeat=args.repeat),
+            "model_load": bench_model_load.run(repeat=args.repeat)
+        }
+
+        if not args.skip_api and args.format == "xlsx":
+            results["api"] = bench_api.run(dataset_path, requests=args.requests)
+
+        results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for name, stage in results["pipeline"]["stages"].items():
+        print(f"{name:>18}: {stage['seconds_min'] * 1000:9.1f} ms  peak {stage['peak_mb']:8.1f} MB")
+
+    for name, stats in results["stockout"].items():
+        print(f"{'stockout.' + name:>18}: {stats['seconds_min'] * 1000:9.1f} ms  {stats['rows']:,} rows")
+
+    for fmt, stats in results["model_load"].items():
+        print(
+            f"{'model_load.' + fmt:>18}: {stats['load_s'] * 1000:9.1f} ms  "
+            f"first predict {stats['first_predict_s'] * 1000:6.1f} ms"
+        )
+
+    for name, stats in results.get("api", {}).items():
+        print(f"{name:>18}: p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms")
+
+    print("✅ Results written to", args.output)
+
+
+if __name__ == "__main__":
+    main()
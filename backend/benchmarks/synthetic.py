@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Synthetic Blinkit-shaped datasets for the benchmarks. Only the sheets and
+# columns build_pipeline reads are generated (see model/ingest.py), plus a
+# festival calendar in the same layout as india_festivals_2020_2026.csv.
+
+CATEGORIES = [
+    "Dairy & Breakfast",
+    "Fruits & Vegetables",
+    "Snacks & Munchies",
+    "Household Care",
+    "Personal Care",
+    "Electronics",
+    "Pet Care",
+    "Baby Care"
+]
+
+
+def generate_frames(products=500, days=365, order_lines=200_000,
+                    festival_density=0.05, lines_per_order=3, seed=0,
+                    start="2024-01-01"):
+    # festival_density is the fraction of calendar days that hold a festival
+    rng = np.random.default_rng(seed)
+    first_day = pd.Timestamp(start)
+
+    product_ids = np.arange(1, products + 1)
+    products_df = pd.DataFrame({
+        "product_id": product_ids,
+        "product_name": [f"Product {i}" for i in product_ids],
+        "category": rng.choice(CATEGORIES, size=products)
+    })
+
+    n_orders = max(order_lines // lines_per_order, 1)
+    orders_df = pd.DataFrame({
+        "order_id": np.arange(1, n_orders + 1),
+        "order_date": first_day + pd.to_timedelta(
+            rng.integers(0, days * 86_400, size=n_orders), unit="s"
+        )
+    })
+
+    # Skewed popularity, so a few products dominate like real baskets
+    popularity = 1.0 / np.arange(1, products + 1)
+    popularity /= popularity.sum()
+
+    items_df = pd.DataFrame({
+        "order_id": rng.integers(1, n_orders + 1, size=order_lines),
+        "product_id": rng.choice(product_ids, size=order_lines, p=popularity),
+        "quantity": rng.integers(1, 6, size=order_lines)
+    })
+
+    # One restock per product per week
+    restocks = np.arange(0, days, 7)
+    inventory_df = pd.DataFrame({
+        "product_id": np.repeat(product_ids, len(restocks)),
+        "date": first_day + pd.to_timedelta(np.tile(restocks, products), unit="D"),
+        "stock_received": rng.integers(0, 200, size=products * len(restocks)),
+        "damaged_stock": rng.integers(0, 5, size=products * len(restocks))
+    })
+
+    n_festivals = int(round(days * festival_density))
+    festival_days = np.sort(rng.choice(days, size=min(n_festivals, days), replace=False))
+    festivals_df = pd.DataFrame({
+        "Date": first_day + pd.to_timedelta(festival_days, unit="D"),
+        "Festival_Name": [f"Festival {i}" for i in range(len(festival_days))],
+        "Source": "Synthetic"
+    })
+
+    sheets = {
+        "blinkit_products": products_df,
+        "blinkit_orders": orders_df,
+        "blinkit_order_items": items_df,
+        "blinkit_inventory": inventory_df
+    }
+
+    return sheets, festivals_df
+
+
+def write_dataset(out_dir, fmt="xlsx", **params):
+    # Writes the dataset under out_dir and returns
+    # (dataset_path, festival_path). fmt="xlsx" gives one workbook, as
+    # uploaded to /predict (Excel caps a sheet at 1,048,575 rows);
+    # fmt="parquet" or "csv" gives a directory with one file per sheet.
+    sheets, festivals_df = generate_frames(**params)
+    os.makedirs(out_dir, exist_ok=True)
+
+    festival_path = os.path.join(out_dir, "festivals.csv")
+    festivals_df.assign(Date=festivals_df["Date"].dt.strftime("%Y-%m-%d")).to_csv(
+        festival_path, index=False
+    )
+
+    if fmt == "xlsx":
+        dataset_path = os.path.join(out_dir, "dataset.xlsx")
+        with pd.ExcelWriter(dataset_path, engine="openpyxl") as writer:
+            for sheet, df in sheets.items():
+                df.to_excel(writer, sheet_name=sheet, index=False)
+
+    elif fmt in ("parquet", "csv"):
+        dataset_path = os.path.join(out_dir, "dataset")
+        os.makedirs(dataset_path, exist_ok=True)
+        for sheet, df in sheets.items():
+            path = os.path.join(dataset_path, f"{sheet}.{fmt}")
+            if fmt == "parquet":
+                df.to_parquet(path, index=False)
+            else:
+                df.to_csv(path, index=False)
+
+    else:
+        raise ValueError(f"Unsupported dataset format: {fmt}")
+
+    return dataset_path, festival_path
@@ -0,0 +1,286 @@
+import os
+import json
+import uuid
+import shutil
+import threading
+from datetime import datetime
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from . import pipeline
+from .ingest import file_sha256
+from .series_store import SeriesStore
+from .festival_calendar import get_calendar
+
+# Versioned, persistent store of the "aggregated" product_features frame.
+#
+# A snapshot is keyed by what produced it: the dataset's content hash, the
+# festival calendar digest and FEATURE_VERSION. It lives in
+#   <STORE_DIR>/<key>/product_features.feather  (sorted by product_id)
+#   <STORE_DIR>/<key>/daily_sales.feather       (dashboard sales history)
+#   <STORE_DIR>/<key>/meta.json                 (source dataset, calendar, ...)
+# so the trainer, /predict and the dashboard read the same features and only
+# the first reader of a dataset runs the pipeline; concurrent first readers
+# wait for that one build. Loaded snapshots are kept in-process and answer
+# product_id and category lookups (row(), by_category()) from indexes built
+# on first use; daily_sales is only read from disk once the dashboard asks
+# for a snapshot's sales history.
+STORE_DIR = os.getenv(
+    "FEATURE_STORE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "instance", "feature_store")
+)
+# Bump when the feature logic changes, so old snapshots are not served
+FEATURE_VERSION = 2
+MAX_SNAPSHOTS = int(os.getenv("FEATURE_STORE_MAX_SNAPSHOTS", "32"))
+MAX_LOADED = int(os.getenv("FEATURE_STORE_MAX_LOADED", "4"))
+
+_loaded = OrderedDict()
+# abs path -> ((mtime_ns, size), sha256), so warm reads skip re-hashing
+_hashes = {}
+_lock = threading.RLock()
+# One lock per snapshot key, so a dataset is built once however many
+# requests miss on it at the same time
+_build_locks = {}
+
+
+class FeatureSnapshot:
+
+    def __init__(self, frame, meta, daily_sales=None, path=None):
+        self.frame = frame
+        self.meta = meta
+        # Either the frame itself (just built) or the snapshot dir to read it from
+        self._daily_sales = daily_sales
+        self._path = path
+        self._series = None
+        self._category_index = None
+        self._lock = threading.Lock()
+
+    def row(self, product_id):
+        # First row for product_id, or None (frame is sorted by product_id)
+        product_ids = self.frame["product_id"].to_numpy()
+        pos = np.searchsorted(product_ids, product_id)
+
+        if pos == len(product_ids) or product_ids[pos] != product_id:
+            return None
+
+        return self.frame.iloc[pos]
+
+    def by_category(self, category):
+        # Rows of one category, in product_id order
+        with self._lock:
+            if self._category_index is None:
+                codes, categories = pd.factorize(self.frame["category"].astype(object), sort=True)
+                order = np.argsort(codes, kind="stable")
+                bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1))
+                self._category_index = (categories, order, bounds)
+
+            categories, order, bounds = self._category_index
+
+        i = categories.get_indexer([category])[0]
+
+        if i < 0:
+            return self.frame.iloc[:0]
+
+        return self.frame.iloc[order[bounds[i]:bounds[i + 1]]]
+
+    @property
+    def series(self):
+        # SeriesStore over the snapshot's daily_sales, built on first use
+        with self._lock:
+            if self._series is None:
+                daily_sales = self._daily_sales
+
+                if daily_sales is None:
+                    daily_sales = pd.read_feather(os.path.join(self._path, "daily_sales.feather"))
+
+                self._series = SeriesStore(daily_sales)
+                self._daily_sales = None
+
+            return self._series
+
+
+def snapshot_key(dataset_sha256, calendar_digest):
+    return f"{dataset_sha256[:24]}-{(calendar_digest or 'none')[:12]}-v{FEATURE_VERSION}"
+
+
+def _snapshot_dir(key):
+    return os.path.join(STORE_DIR, key)
+
+
+def _load(key):
+    path = _snapshot_dir(key)
+
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        frame = pd.read_feather(os.path.join(path, "product_features.feather"))
+    except (OSError, ValueError):
+        return None
+
+    return FeatureSnapshot(frame, meta, path=path)
+
+
+def _write(key, frame, daily_sales, meta):
+    os.makedirs(STORE_DIR, exist_ok=True)
+
+    # Built in a temp dir and renamed in, so readers never see half a snapshot
+    tmp = os.path.join(STORE_DIR, f".{key}.{uuid.uuid4().hex}.tmp")
+    os.makedirs(tmp)
+
+    try:
+        frame.to_feather(os.path.join(tmp, "product_features.feather"))
+        daily_sales.to_feather(os.path.join(tmp, "daily_sales.feather"))
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        os.rename(tmp, _snapshot_dir(key))
+    except OSError:
+        # Another process stored the same snapshot first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    _evict()
+
+
+def _evict():
+    snapshots = [
+        entry for entry in os.scandir(STORE_DIR)
+        if entry.is_dir() and not entry.name.startswith(".")
+    ]
+
+    if len(snapshots) <= MAX_SNAPSHOTS:
+        return
+
+    snapshots.sort(key=lambda entry: entry.stat().st_mtime)
+
+    for entry in snapshots[:len(snapshots) - MAX_SNAPSHOTS]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def dataset_sha256(dataset_path):
+    # Content hash of a dataset file, re-hashed only when its mtime/size change
+    path = os.path.abspath(dataset_path)
+    st = os.stat(path)
+    stat_key = (st.st_mtime_ns, st.st_size)
+
+    with _lock:
+        cached = _hashes.get(path)
+
+    if cached is not None and cached[0] == stat_key:
+        return cached[1]
+
+    sha256 = file_sha256(path)
+
+    with _lock:
+        _hashes[path] = (stat_key, sha256)
+
+    return sha256
+
+
+def _build(dataset_path, state_key):
+    output = pipeline.build_pipeline(dataset_path, state_key=state_key)
+    frame = output["aggregated"].sort_values("product_id", kind="stable").reset_index(drop=True)
+    return frame, output["daily_sales"]
+
+
+def _cached(key):
+    with _lock:
+        snapshot = _loaded.get(key)
+
+        if snapshot is not None:
+            _loaded.move_to_end(key)
+
+        return snapshot
+
+
+def _load_or_build(key, dataset_path, sha256, calendar, state_key, source_name):
+    snapshot = _load(key)
+
+    if snapshot is None:
+        frame, daily_sales = _build(dataset_path, state_key)
+
+        meta = {
+            "key": key,
+            "feature_version": FEATURE_VERSION,
+            "dataset_path": source_name or os.path.abspath(dataset_path),
+            "dataset_sha256": sha256,
+            "festival_digest": calendar.digest,
+            "rows": len(frame),
+            "columns": list(frame.columns),
+            "created_at": datetime.utcnow().isoformat()
+        }
+        _write(key, frame, daily_sales, meta)
+        snapshot = FeatureSnapshot(frame, meta, daily_sales=daily_sales)
+
+    with _lock:
+        _loaded[key] = snapshot
+        _loaded.move_to_end(key)
+
+        while len(_loaded) > MAX_LOADED:
+            evicted, _ = _loaded.popitem(last=False)
+            _build_locks.pop(evicted, None)
+
+    return snapshot
+
+
+def get_snapshot(dataset_path, sha256=None, state_key=None, source_name=None):
+    # Snapshot for the dataset's current content, built (and stored) by
+    # build_pipeline on a miss; state_key is passed on to that build.
+    # source_name is what meta records as the dataset (e.g. the uploaded
+    # file name, when dataset_path is a temp file).
+    # Directory datasets have no content hash, so they are always built.
+    if sha256 is None:
+        if os.path.isdir(dataset_path):
+            frame, daily_sales = _build(dataset_path, state_key)
+            return FeatureSnapshot(frame, {"dataset_path": dataset_path}, daily_sales=daily_sales)
+        sha256 = dataset_sha256(dataset_path)
+
+    calendar = get_calendar(pipeline.FESTIVAL_PATH)
+    key = snapshot_key(sha256, calendar.digest)
+
+    snapshot = _cached(key)
+
+    if snapshot is not None:
+        return snapshot
+
+    with _lock:
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+
+    with build_lock:
+        # Another request may have loaded or built it while we waited
+        snapshot = _cached(key)
+
+        if snapshot is None:
+            snapshot = _load_or_build(key, dataset_path, sha256, calendar, state_key, source_name)
+
+    return snapshot
+
+
+def get_features(dataset_path, sha256=None, state_key=None, source_name=None):
+    # The "aggregated" frame of build_pipeline(), sorted by product_id.
+    # Shared between callers: treat it as read-only.
+    return get_snapshot(
+        dataset_path, sha256=sha256, state_key=state_key, source_name=source_name
+    ).frame
+
+
+def get_series_store(dataset_path, sha256=None):
+    # Sales history of the snapshot get_features() serves for the dataset
+    snapshot = get_snapshot(dataset_path, sha256=sha256)
+
+    try:
+        return snapshot.series
+    except OSError:
+        # Evicted from disk since it was loaded: drop it and build it again
+        with _lock:
+            _loaded.pop(snapshot.meta.get("key"), None)
+
+        return get_snapshot(dataset_path, sha256=sha256).series
+
+
+def clear_feature_store(disk=False):
+    with _lock:
+        _loaded.clear()
+        _hashes.clear()
+        _build_locks.clear()
+
+    if disk and os.path.isdir(STORE_DIR):
+        shutil.rmtree(STORE_DIR)
@@ -0,0 +1,192 @@
+import os
+import re
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(__file__)
+
+FESTIVAL_PATH = os.path.join(BASE_DIR, "india_festivals_2020_2026.csv")
+
+# Festival window around each festival date (closed interval, in days)
+FESTIVAL_DAYS_BEFORE = int(os.getenv("FESTIVAL_DAYS_BEFORE", "7"))
+FESTIVAL_DAYS_AFTER = int(os.getenv("FESTIVAL_DAYS_AFTER", "3"))
+
+
+def _parse_boosts(spec):
+    # "Electronics=1,Toys=0.5" -> {"Electronics": 1, "Toys": 0.5}
+    boosts = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        category, _, weight = item.partition("=")
+        weight = float(weight) if weight else 1
+        boosts[category.strip()] = int(weight) if weight == int(weight) else weight
+    return boosts
+
+
+# Product categories whose festival-window order lines also count towards a
+# festival_<category>_boost feature (score * weight). Electronics is always
+# kept: festival_electronics_boost is a feature the demand model is trained
+# on. FESTIVAL_CATEGORY_BOOSTS adds categories or overrides its weight.
+CATEGORY_BOOSTS = {
+    "Electronics": 1,
+    **_parse_boosts(os.getenv("FESTIVAL_CATEGORY_BOOSTS", ""))
+}
+
+
+def boost_feature(category):
+    return "festival_" + re.sub(r"[^0-9a-z]+", "_", category.lower()).strip("_") + "_boost"
+
+
+class FestivalCalendar:
+    # The festival CSV compiled into per-calendar-day score arrays, so
+    # scoring an order date is an O(1) lookup by day ordinal.
+    #
+    # An order falls in a festival's window when
+    #   Date - days_before <= order_date <= Date + days_after
+    # and its score is the MAX impact_score (default 1) over every window
+    # that covers it, 0 otherwise. Because window bounds fall on midnight,
+    # the last day of a window only covers its 00:00:00 instant, which is
+    # kept in a separate "edge" array.
+
+    def __init__(self, festival_df, days_before=None, days_after=None,
+                 category_boosts=None, digest=None):
+        self.days_before = FESTIVAL_DAYS_BEFORE if days_before is None else days_before
+        self.days_after = FESTIVAL_DAYS_AFTER if days_after is None else days_after
+        self.category_boosts = dict(CATEGORY_BOOSTS if category_boosts is None else category_boosts)
+        self.boost_features = [boost_feature(c) for c in self.category_boosts]
+        # Identifies the calendar + settings (incremental state is keyed on it)
+        self.digest = digest
+
+        fest = festival_df.dropna(subset=["Date"]).sort_values("Date", kind="stable")
+
+        if "impact_score" in fest.columns:
+            impact = fest["impact_score"].fillna(1).to_numpy()
+        else:
+            impact = np.ones(len(fest), dtype=np.int32)
+
+        self.score_dtype = np.result_type(impact.dtype, np.int32)
+        self.dates = fest["Date"].to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+        self.names = (
+            fest["Festival_Name"].astype(str).to_numpy()
+            if "Festival_Name" in fest.columns else np.full(len(fest), "", dtype=object)
+        )
+        self.impact = impact
+
+        window = self.days_before + self.days_after
+
+        if fest.empty:
+            self.first_day = np.datetime64("1970-01-01", "D")
+            self.day_score = np.zeros(0, dtype=self.score_dtype)
+            self.edge_score = np.zeros(0, dtype=self.score_dtype)
+            return
+
+        window_start = self.dates - np.timedelta64(self.days_before, "D")
+        self.first_day = window_start.min()
+        start = (window_start - self.first_day).astype(np.int64)
+        n_days = int(start.max()) + window + 1
+
+        self.day_score = np.zeros(n_days, dtype=self.score_dtype)
+        np.maximum.at(
+            self.day_score,
+            (start[:, None] + np.arange(window)).ravel(),
+            np.repeat(impact, window)
+        )
+
+        self.edge_score = np.zeros(n_days, dtype=self.score_dtype)
+        np.maximum.at(self.edge_score, start + window, impact)
+
+    def scores(self, order_dates):
+        # Festival score of each order timestamp (datetime64 array-like)
+        ts = np.asarray(order_dates, dtype="datetime64[ns]")
+        scores = np.zeros(len(ts), dtype=self.score_dtype)
+
+        if len(self.day_score) == 0 or len(ts) == 0:
+            return scores
+
+        days = ts.astype("datetime64[D]")
+        pos = (days - self.first_day).astype(np.int64)
+        inside = (pos >= 0) & (pos < len(self.day_score))
+
+        pos = pos[inside]
+        at_midnight = ts[inside] == days[inside]
+        scores[inside] = np.where(
+            at_midnight,
+            np.maximum(self.day_score[pos], self.edge_score[pos]),
+            self.day_score[pos]
+        )
+
+        return scores
+
+    def category_codes(self, categories):
+        # Position of each category in category_boosts, -1 for the rest
+        codes = pd.Index(list(self.category_boosts)).get_indexer(pd.Series(categories).astype(object))
+        return codes.astype(np.int8 if len(self.category_boosts) <= 127 else np.int32)
+
+    def boosts(self, scores, category_codes):
+        # boost feature -> per-line score * weight, 0 outside its category
+        return {
+            feature: np.where(category_codes == i, scores * weight, 0).astype(
+                np.result_type(scores.dtype, type(weight))
+            )
+            for i, (feature, weight) in enumerate(
+                zip(self.boost_features, self.category_boosts.values())
+            )
+        }
+
+    def upcoming(self, start, days):
+        # Festivals dated within [start, start + days)
+        start = np.datetime64(start, "D")
+        lo, hi = np.searchsorted(self.dates, [start, start + np.timedelta64(days, "D")])
+
+        return [
+            {
+                "date": str(self.dates[i]),
+                "festival_name": self.names[i],
+                "impact_score": self.impact[i].item()
+            }
+            for i in range(lo, hi)
+        ]
+
+
+_calendars = {}
+_lock = threading.Lock()
+
+
+def _read_festivals(path):
+    if os.path.exists(path):
+        festival_df = pd.read_csv(path)
+        festival_df["Date"] = pd.to_datetime(festival_df["Date"])
+    else:
+        festival_df = pd.DataFrame(columns=["Date", "impact_score"])
+
+    return festival_df
+
+
+def get_calendar(path=None):
+    # Compiled once per process and CSV version; later calls are a stat()
+    path = os.path.abspath(path or FESTIVAL_PATH)
+
+    try:
+        st = os.stat(path)
+        stat_key = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        stat_key = None
+
+    with _lock:
+        cached = _calendars.get(path)
+
+        if cached is not None and cached[0] == stat_key:
+            return cached[1]
+
+        digest = hashlib.sha256(
+            f"{FESTIVAL_DAYS_BEFORE}:{FESTIVAL_DAYS_AFTER}:{sorted(CATEGORY_BOOSTS.items())}".encode()
+        )
+        if stat_key is not None:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+
+        calendar = FestivalCalendar(_read_festivals(path), digest=digest.hexdigest())
+        _calendars[path] = (stat_key, calendar)
+
+        return calendar
@@ -0,0 +1,319 @@
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+BASE_DIR = os.path.dirname(__file__)
+
+INT32_MIN, INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+
+# Sheets (and the only columns of them) that build_pipeline uses
+REQUIRED_SHEETS = {
+    "blinkit_inventory": ["product_id", "stock_received", "damaged_stock"],
+    "blinkit_orders": ["order_id", "order_date"],
+    "blinkit_order_items": ["order_id", "product_id", "quantity"],
+    "blinkit_products": ["product_id", "product_name", "category"]
+}
+
+DATE_COLUMNS = {
+    "blinkit_orders": ["order_date"]
+}
+
+# Compact dtypes applied on load, so merges and groupbys run on small data.
+# "int" columns become int32 when every value fits (otherwise they keep
+# their parsed type, e.g. int64 ids or float columns with blanks).
+SCHEMA = {
+    "blinkit_inventory": {
+        "product_id": "int",
+        "stock_received": "int",
+        "damaged_stock": "int"
+    },
+    "blinkit_orders": {"order_id": "int"},
+    "blinkit_order_items": {
+        "order_id": "int",
+        "product_id": "int",
+        "quantity": "int"
+    },
+    "blinkit_products": {
+        "product_id": "int",
+        "product_name": "category",
+        "category": "category"
+    }
+}
+
+# Part of the sheet cache path; bump when SCHEMA or the columns change
+SCHEMA_VERSION = 2
+
+# Parsed sheets are stored as uncompressed Feather (Arrow IPC) files under
+# <CACHE_DIR>/<sha256 of workbook>-v<SCHEMA_VERSION>/<sheet>.feather so they
+# can be memory-mapped
+CACHE_DIR = os.getenv(
+    "SHEET_CACHE_DIR",
+    os.path.join(BASE_DIR, "..", "instance", "sheet_cache")
+)
+# Writes evict workbooks older than the TTL (by write time), directories of
+# other schema versions, then least recently read workbooks (directory
+# atime, set on every hit) until the cache is under MAX_BYTES
+CACHE_MAX_BYTES = int(os.getenv("SHEET_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.getenv("SHEET_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _compact_int(col):
+    if col.dtype.kind not in "iuf" or col.isna().any():
+        return col
+
+    values = col.to_numpy()
+
+    if col.dtype.kind == "f" and not np.array_equal(values, np.floor(values)):
+        return col
+
+    if len(values) and (values.min() < INT32_MIN or values.max() > INT32_MAX):
+        return col
+
+    return col.astype(np.int32)
+
+
+def apply_schema(sheet, df):
+    casts = {}
+
+    for col, kind in SCHEMA[sheet].items():
+        if kind == "int":
+            casts[col] = _compact_int(df[col])
+        elif df[col].dtype != "category":
+            casts[col] = df[col].astype("category")
+
+    return df.assign(**casts)
+
+
+def _prepare(sheet, df):
+    columns = REQUIRED_SHEETS[sheet]
+
+    missing_cols = [c for c in columns if c not in df.columns]
+    if missing_cols:
+        raise ValueError(
+            f"Sheet {sheet} is missing column(s): {', '.join(missing_cols)}"
+        )
+
+    dates = {
+        col: pd.to_datetime(df[col], errors="coerce")
+        for col in DATE_COLUMNS.get(sheet, [])
+    }
+
+    return apply_schema(sheet, df[columns].assign(**dates))
+
+
+def _read_workbook(dataset_path):
+    xls = pd.ExcelFile(dataset_path)
+
+    missing = [s for s in REQUIRED_SHEETS if s not in xls.sheet_names]
+    if missing:
+        raise ValueError("Required sheets missing in Excel file.")
+
+    return {
+        sheet: _prepare(sheet, xls.parse(sheet, usecols=lambda c, cols=columns: c in cols))
+        for sheet, columns in REQUIRED_SHEETS.items()
+    }
+
+
+# ---------- Directory datasets (one <sheet>.parquet / <sheet>.csv each) ----------
+def _sheet_file(dataset_path, sheet):
+    for ext in (".parquet", ".csv"):
+        path = os.path.join(dataset_path, sheet + ext)
+        if os.path.exists(path):
+            return path
+
+    raise ValueError(f"Required sheet {sheet} missing in dataset directory.")
+
+
+def _read_directory(dataset_path):
+    sheets = {}
+
+    for sheet, columns in REQUIRED_SHEETS.items():
+        path = _sheet_file(dataset_path, sheet)
+
+        if path.endswith(".parquet"):
+            df = pd.read_parquet(path, columns=columns)
+        else:
+            df = pd.read_csv(path, usecols=lambda c, cols=columns: c in cols)
+
+        sheets[sheet] = _prepare(sheet, df)
+
+    return sheets
+
+
+# ---------- Chunked readers (streaming mode) ----------
+def _iter_excel_chunks(dataset_path, sheet, chunk_size):
+    wb = load_workbook(dataset_path, read_only=True, data_only=True)
+
+    try:
+        if sheet not in wb.sheetnames:
+            raise ValueError("Required sheets missing in Excel file.")
+
+        rows = wb[sheet].iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        buffer = []
+
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield _prepare(sheet, pd.DataFrame(buffer, columns=header))
+                buffer = []
+
+        if buffer or not header:
+            yield _prepare(sheet, pd.DataFrame(buffer, columns=header))
+    finally:
+        wb.close()
+
+
+def iter_sheet_chunks(dataset_path, sheet, chunk_size=50_000):
+    columns = REQUIRED_SHEETS[sheet]
+
+    if not os.path.isdir(dataset_path):
+        yield from _iter_excel_chunks(dataset_path, sheet, chunk_size)
+        return
+
+    path = _sheet_file(dataset_path, sheet)
+
+    if path.endswith(".parquet"):
+        batches = pq.ParquetFile(path).iter_batches(
+            batch_size=chunk_size, columns=columns
+        )
+        for batch in batches:
+            yield _prepare(sheet, batch.to_pandas())
+    else:
+        reader = pd.read_csv(
+            path, usecols=lambda c: c in columns, chunksize=chunk_size
+        )
+        for chunk in reader:
+            yield _prepare(sheet, chunk)
+
+
+def read_sheet(dataset_path, sheet):
+    chunks = list(iter_sheet_chunks(dataset_path, sheet))
+
+    if not chunks:
+        return pd.DataFrame(columns=REQUIRED_SHEETS[sheet])
+
+    # Per-chunk categoricals concat to object; cast the whole sheet again
+    return apply_schema(sheet, pd.concat(chunks, ignore_index=True))
+
+
+def _write_cache(cache_path, sheets):
+    os.makedirs(cache_path, exist_ok=True)
+
+    for sheet, df in sheets.items():
+        target = os.path.join(cache_path, f"{sheet}.feather")
+        # Unique per call: concurrent first loads of one workbook each
+        # write their own temp file, and the last rename wins
+        tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+
+        try:
+            feather.write_feather(
+                df.reset_index(drop=True), tmp, compression="uncompressed"
+            )
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def _dir_size(path):
+    total = 0
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                total += entry.stat().st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def _evict_cache(keep):
+    now = time.time()
+    suffix = f"-v{SCHEMA_VERSION}"
+    entries = []
+
+    with os.scandir(CACHE_DIR) as it:
+        for entry in it:
+            if not entry.is_dir() or entry.path == keep:
+                continue
+
+            try:
+                st = entry.stat()
+                size = _dir_size(entry.path)
+            except FileNotFoundError:
+                continue
+
+            if not entry.name.endswith(suffix) or now - st.st_mtime > CACHE_TTL_SECONDS:
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                entries.append((st.st_atime, size, entry.path))
+
+    total = sum(size for _, size, _ in entries) + _dir_size(keep)
+
+    for _, size, path in sorted(entries):
+        if total <= CACHE_MAX_BYTES:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def _read_cache(cache_path):
+    sheets = {}
+
+    for sheet in REQUIRED_SHEETS:
+        table = feather.read_table(
+            os.path.join(cache_path, f"{sheet}.feather"), memory_map=True
+        )
+        sheets[sheet] = table.to_pandas()
+
+    return sheets
+
+
+def load_sheets(dataset_path):
+    if os.path.isdir(dataset_path):
+        return _read_directory(dataset_path)
+
+    cache_path = os.path.join(CACHE_DIR, f"{file_sha256(dataset_path)}-v{SCHEMA_VERSION}")
+
+    cached = all(
+        os.path.exists(os.path.join(cache_path, f"{sheet}.feather"))
+        for sheet in REQUIRED_SHEETS
+    )
+
+    if cached:
+        try:
+            sheets = _read_cache(cache_path)
+            os.utime(cache_path, (time.time(), os.stat(cache_path).st_mtime))
+            return sheets
+        except (OSError, ValueError) as e:
+            # Evicted by another process while being read, or a truncated /
+            # corrupt file (pyarrow.ArrowInvalid is a ValueError): drop the
+            # entry and rebuild it from the workbook
+            print("⚠️ Discarding unreadable sheet cache:", str(e))
+            shutil.rmtree(cache_path, ignore_errors=True)
+
+    sheets = _read_workbook(dataset_path)
+
+    try:
+        _write_cache(cache_path, sheets)
+        _evict_cache(cache_path)
+    except OSError as e:
+        # A read-only or full disk only costs us the cache, not the request
+        print("⚠️ Could not write sheet cache:", str(e))
+
+    return sheets
@@ -0,0 +1,197 @@
+import os
+import time
+import resource
+import threading
+from collections import defaultdict
+
+# Lightweight stage/request metrics, exported in Prometheus text format.
+#
+# Off unless METRICS_ENABLED=1 (or enable() is called): span() then returns
+# a shared no-op object, so an instrumented stage costs one flag check.
+# Metrics live in the process, so under gunicorn each worker reports its own.
+ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+
+# Upper bounds (seconds) shared by every latency histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+
+def _rss_bytes():
+    # Current RSS from /proc where available, otherwise the peak
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Histogram:
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series = defaultdict(lambda: [[0] * len(BUCKETS), 0, 0.0])
+
+    def observe(self, labels, value):
+        with _lock:
+            series = self._series[labels]
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+
+        with _lock:
+            items = [(labels, list(b), n, total) for labels, (b, n, total) in self._series.items()]
+
+        for labels, buckets, count, total in items:
+            base = _labels(self.label_names, labels)
+            for bound, hits in zip(BUCKETS, buckets):
+                lines.append(f'{self.name}_bucket{{{base}le="{bound}"}} {hits}')
+            lines.append(f'{self.name}_bucket{{{base}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_count{{{base.rstrip(',')}}} {count}")
+            lines.append(f"{self.name}_sum{{{base.rstrip(',')}}} {total}")
+
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name, help_text, label_names, kind="counter"):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.kind = kind
+        self._values = defaultdict(float)
+
+    def inc(self, labels, value=1):
+        with _lock:
+            self._values[labels] += value
+
+    def set(self, labels, value):
+        with _lock:
+            self._values[labels] = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+        with _lock:
+            items = list(self._values.items())
+
+        for labels, value in items:
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels).rstrip(',')}}} {value}")
+
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    # 'a="x",b="y",' (trailing comma, so "le" can follow)
+    return "".join(f'{name}="{_escape(value)}",' for name, value in zip(names, values))
+
+
+STAGE_SECONDS = Histogram(
+    "inventopredict_stage_duration_seconds",
+    "Time spent in a pipeline/prediction stage.",
+    ("stage",)
+)
+STAGE_ROWS = Counter(
+    "inventopredict_stage_rows_total",
+    "Rows processed by a pipeline/prediction stage.",
+    ("stage",)
+)
+STAGE_MEMORY = Counter(
+    "inventopredict_stage_last_rss_delta_bytes",
+    "Resident memory change over the last run of a stage.",
+    ("stage",),
+    kind="gauge"
+)
+REQUEST_SECONDS = Histogram(
+    "inventopredict_http_request_duration_seconds",
+    "Flask request latency by route.",
+    ("method", "route", "status")
+)
+
+RESULT_CACHE_LOOKUPS = Counter(
+    "inventopredict_result_cache_lookups_total",
+    "Upload result cache lookups by outcome (hit/miss).",
+    ("result",)
+)
+
+_REGISTRY = [STAGE_SECONDS, STAGE_ROWS, STAGE_MEMORY, REQUEST_SECONDS, RESULT_CACHE_LOOKUPS]
+
+
+class _NoopSpan:
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+
+    def __init__(self, name, rows):
+        self.name = name
+        # May be set inside the block once the row count is known
+        self.rows = rows
+
+    def __enter__(self):
+        self._rss = _rss_bytes()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        labels = (self.name,)
+
+        STAGE_SECONDS.observe(labels, elapsed)
+        STAGE_MEMORY.set(labels, _rss_bytes() - self._rss)
+
+        if self.rows is not None:
+            STAGE_ROWS.inc(labels, self.rows)
+
+        return False
+
+
+def span(name, rows=None):
+    # with span("merge") as s: ...; s.rows = len(df)
+    if not ENABLED:
+        return _NOOP_SPAN
+    return _Span(name, rows)
+
+
+def observe_request(method, route, status, seconds):
+    if ENABLED:
+        REQUEST_SECONDS.observe((method, route, status), seconds)
+
+
+def observe_result_cache(hit):
+    if ENABLED:
+        RESULT_CACHE_LOOKUPS.inc(("hit" if hit else "miss",))
+
+
+def render_metrics():
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+# Array kernels behind ProductAggregates: keys are resolved to dense integer
+# positions/codes once, then joins are array indexing and group sums are
+# np.bincount, instead of pandas merges and groupbys over the wide frame.
+
+
+def positions(index_keys, keys):
+    # Row of each key in index_keys (-1 when absent), or None when
+    # index_keys is not unique and a lookup cannot stand in for a merge
+    index = pd.Index(index_keys)
+
+    if not index.is_unique:
+        return None
+
+    return index.get_indexer(keys)
+
+
+def take(values, pos, fill):
+    # values[pos] with `fill` where pos == -1; values' dtype must hold fill
+    out = np.full(len(pos), fill, dtype=values.dtype)
+    found = pos >= 0
+    out[found] = values[pos[found]]
+    return out
+
+
+def group_sum(codes, n_groups, values):
+    # Sum of values per code in [0, n_groups). NaN counts as 0 like
+    # groupby().sum(); integer input gives int64 sums (exact below 2**53).
+    values = np.asarray(values)
+
+    if values.dtype.kind == "f":
+        return np.bincount(codes, weights=np.nan_to_num(values), minlength=n_groups)
+
+    if values.dtype.kind in "iub":
+        sums = np.bincount(codes, weights=values.astype(np.float64), minlength=n_groups)
+        return np.rint(sums).astype(np.int64)
+
+    return np.bincount(codes, weights=values.astype(np.float64), minlength=n_groups)
+
+
+def group_mean_std(codes, n_groups, values):
+    # Per-group mean and sample std (ddof=1, NaN for single-row groups),
+    # with a two-pass deviation sum for stability
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.bincount(codes, minlength=n_groups)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(codes, weights=values, minlength=n_groups) / counts
+        dev = values - mean[codes]
+        var = np.bincount(codes, weights=dev * dev, minlength=n_groups) / (counts - 1)
+
+    std = np.where(counts > 1, np.sqrt(np.maximum(var, 0)), np.nan)
+    return mean, std
@@ -0,0 +1,95 @@
+import os
+import threading
+import joblib
+import xgboost as xgb
+from .ingest import file_sha256
+
+BASE_DIR = os.path.dirname(__file__)
+
+# One demand model per process, loaded on first use and shared by
+# predict.py, app.py and anything else that imports get_model().
+# The native XGBoost UBJSON file is preferred when present: it skips
+# unpickling the sklearn wrapper and loads faster with a smaller footprint.
+# The joblib pickle stays as the fallback for older deployments.
+MODEL_PATH = os.getenv(
+    "MODEL_PATH",
+    os.path.join(BASE_DIR, "demand_model.pkl")
+)
+NATIVE_MODEL_PATH = os.getenv(
+    "NATIVE_MODEL_PATH",
+    os.path.join(BASE_DIR, "demand_model.ubj")
+)
+
+_model = None
+# Content hash of the file _model was loaded from
+_version = None
+_lock = threading.Lock()
+
+
+def _load():
+    # (model, path it was loaded from)
+    if os.path.exists(NATIVE_MODEL_PATH):
+        model = xgb.XGBRegressor()
+        model.load_model(NATIVE_MODEL_PATH)
+        return model, NATIVE_MODEL_PATH
+
+    if os.path.exists(MODEL_PATH):
+        return joblib.load(MODEL_PATH), MODEL_PATH
+
+    raise FileNotFoundError("Model file not found. Train the model first.")
+
+
+def get_model():
+    global _model, _version
+
+    if _model is None:
+        with _lock:
+            if _model is None:
+                model, path = _load()
+                _version = file_sha256(path)
+                _model = model
+                print("✅ ML model loaded successfully")
+
+    return _model
+
+
+def model_version():
+    # Identifies the served model, e.g. for keying cached predictions
+    version = _version
+    while version is None:
+        get_model()
+        version = _version
+    return version
+
+
+def _save_native(model):
+    tmp = f"{NATIVE_MODEL_PATH}.{os.getpid()}.tmp.ubj"
+    model.save_model(tmp)
+    os.replace(tmp, NATIVE_MODEL_PATH)
+
+
+def save_model(model):
+    # Writes both formats; the pickle keeps old readers working
+    joblib.dump(model, MODEL_PATH)
+    _save_native(model)
+    reset_model()
+
+
+def export_native():
+    # One-off conversion of an existing pickle to the native format:
+    #   python -m model.model_registry
+    _save_native(joblib.load(MODEL_PATH))
+    reset_model()
+    return NATIVE_MODEL_PATH
+
+
+def reset_model():
+    global _model, _version
+
+    with _lock:
+        _model = None
+        _version = None
+
+
+if __name__ == "__main__":
+    print("✅ Native model written to", export_native())
@@ -1,137 +1,517 @@
 import pandas as pd
 import numpy as np
 import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from .ingest import load_sheets, read_sheet, iter_sheet_chunks
+from .pipeline_state import load_state, save_state, state_lock, row_hashes, rows_digest
+from .instrumentation import span
+from .kernels import positions, take, group_sum, group_mean_std
+from .festival_calendar import FESTIVAL_PATH, get_calendar
 
-def build_pipeline(dataset_path: str):
+BASE_DIR = os.path.dirname(__file__)
 
-    BASE_DIR = os.path.dirname(__file__)
-    festival_path = os.path.join(BASE_DIR, "india_festivals_2020_2026.csv")
 
-    # ---------- Load Excel ----------
-    df_dict = pd.read_excel(dataset_path, sheet_name=None)
+def _sum_by_key(parts, level):
+    # Collapse partial group sums (Series sharing the same index names)
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts).groupby(level=level).sum()
 
-    inventory = df_dict.get("blinkit_inventory")
-    orders = df_dict.get("blinkit_orders")
-    order_items = df_dict.get("blinkit_order_items")
-    products = df_dict.get("blinkit_products")
 
-    if inventory is None or orders is None or order_items is None or products is None:
-        raise ValueError("Required sheets missing in Excel file.")
+def _order_lines(order_items, orders, products, calendar):
+    # (product_id, order_date, quantity, category_code) arrays for order
+    # lines with a valid order date; category_code indexes the calendar's
+    # category boosts (-1 for none). Joins are array lookups when orders and
+    # products are unique on their key; duplicated keys fall back to merges,
+    # which multiply the matching lines.
+    order_pos = positions(orders["order_id"], order_items["order_id"])
+    product_pos = positions(products["product_id"], order_items["product_id"])
 
-    orders["order_date"] = pd.to_datetime(orders["order_date"], errors="coerce")
-    inventory["date"] = pd.to_datetime(inventory["date"], errors="coerce")
+    if order_pos is None or product_pos is None:
+        df = order_items.merge(
+            orders[["order_id", "order_date"]],
+            on="order_id",
+            how="left"
+        )
 
-    # ---------- Festival ----------
-    if os.path.exists(festival_path):
-        festival_df = pd.read_csv(festival_path)
-        festival_df["Date"] = pd.to_datetime(festival_df["Date"])
-    else:
-        festival_df = pd.DataFrame(columns=["Date", "impact_score"])
+        df = df.merge(
+            products[["product_id", "category"]],
+            on="product_id",
+            how="left"
+        )
+
+        df = df.dropna(subset=["order_date"])
+
+        return (
+            df["product_id"].to_numpy(),
+            df["order_date"].to_numpy(dtype="datetime64[ns]"),
+            df["quantity"].to_numpy(),
+            calendar.category_codes(df["category"])
+        )
 
-    # ---------- Merge ----------
-    df = order_items.merge(
-        orders[["order_id", "order_date"]],
-        on="order_id",
-        how="left"
+    order_date = take(
+        orders["order_date"].to_numpy(dtype="datetime64[ns]"),
+        order_pos,
+        np.datetime64("NaT")
     )
+    category_code = take(
+        calendar.category_codes(products["category"]),
+        product_pos,
+        -1
+    )
+
+    dated = ~np.isnat(order_date)
 
-    df = df.merge(
-        products[["product_id", "category"]],
-        on="product_id",
-        how="left"
+    return (
+        order_items["product_id"].to_numpy()[dated],
+        order_date[dated],
+        order_items["quantity"].to_numpy()[dated],
+        category_code[dated]
     )
 
-    df = df.dropna(subset=["order_date"])
 
-    if df.empty:
-        raise ValueError("No valid order_date data after merge.")
+class ProductAggregates:
+    # Running per-product state that build_pipeline folds order items and
+    # inventory rows into. Memory is proportional to the number of
+    # (product_id, order_date) pairs and products, not to order lines:
+    #   daily    - quantity sum per (product_id, order_date)
+    #   festival - festival_score / category boost sums and line counts
+    #   stock    - stock_received / damaged_stock sums per product
+    #
+    # Each batch is reduced with the integer-code kernels in kernels.py;
+    # only the small per-key results are combined with pandas.
 
-    # ---------- Festival Features ----------
-    df["festival_score"] = 0
+    def __init__(self):
+        self.daily = None
+        self.festival = None
+        self.stock = None
 
-    for _, fest in festival_df.iterrows():
-        fest_date = fest["Date"]
-        impact = fest.get("impact_score", 1)
+    def add_order_items(self, order_items, orders, products, calendar):
+        # ---------- Join ----------
+        with span("merge", rows=len(order_items)):
+            lines = _order_lines(order_items, orders, products, calendar)
 
-        start = fest_date - pd.Timedelta(days=7)
-        end = fest_date + pd.Timedelta(days=3)
+        self.add_lines(*lines, calendar)
 
-        df.loc[
-            (df["order_date"] >= start) &
-            (df["order_date"] <= end),
-            "festival_score"
-        ] = impact
+    def add_lines(self, product_id, order_date, quantity, category_code, calendar):
+        # Folds already-joined order lines (the arrays from _order_lines)
+        if len(product_id) == 0:
+            return
 
-    df["festival_electronics_boost"] = 0
-    df.loc[
-        (df["festival_score"] > 0) &
-        (df["category"] == "Electronics"),
-        "festival_electronics_boost"
-    ] = df["festival_score"]
+        # ---------- Festival Features ----------
+        with span("festival_features", rows=len(product_id)):
+            festival_score = calendar.scores(order_date)
+            boosts = calendar.boosts(festival_score, category_code)
 
-    # ---------- Daily Sales (FOR DASHBOARD) ----------
-    daily_sales = df.groupby(
-        ["product_id", "order_date"]
-    )["quantity"].sum().reset_index()
+        # ---------- Fold ----------
+        with span("groupby", rows=len(product_id)):
+            # Lines without a product_id are dropped, as groupby would
+            product_codes, product_ids = pd.factorize(product_id, sort=True)
+            keep = product_codes >= 0
+            product_codes = product_codes[keep]
 
-    if daily_sales.empty:
-        raise ValueError("Daily sales dataframe is empty.")
+            date_codes, dates = pd.factorize(order_date[keep], sort=True)
 
-    # ---------- Aggregated Features (FOR PREDICTION) ----------
-    product_features = daily_sales.groupby("product_id")["quantity"].agg([
-        "mean", "std"
-    ]).reset_index()
+            # (product, date) pairs as one sorted int64 key
+            pair_keys, pair_codes = np.unique(
+                product_codes.astype(np.int64) * len(dates) + date_codes,
+                return_inverse=True
+            )
 
-    product_features.rename(columns={
-        "mean": "avg_daily_sales",
-        "std": "sales_volatility"
-    }, inplace=True)
+            daily = pd.Series(
+                group_sum(pair_codes, len(pair_keys), quantity[keep]),
+                index=pd.MultiIndex.from_arrays(
+                    [product_ids[pair_keys // len(dates)], dates[pair_keys % len(dates)]],
+                    names=["product_id", "order_date"]
+                ),
+                name="quantity"
+            )
 
-    product_features["sales_volatility"] = product_features["sales_volatility"].fillna(0)
+            n_products = len(product_ids)
+            festival = pd.DataFrame({
+                "festival_score": group_sum(product_codes, n_products, festival_score[keep]),
+                **{
+                    feature: group_sum(product_codes, n_products, boost[keep])
+                    for feature, boost in boosts.items()
+                },
+                "line_count": np.bincount(product_codes, minlength=n_products)
+            }, index=pd.Index(product_ids, name="product_id"))
 
-    # Festival Aggregation
-    festival_features = df.groupby("product_id")[[
-        "festival_score",
-        "festival_electronics_boost"
-    ]].mean().reset_index()
+            if self.daily is not None:
+                daily = _sum_by_key([self.daily, daily], [0, 1])
+                festival = _sum_by_key([self.festival, festival], 0)
 
-    product_features = product_features.merge(
-        festival_features,
-        on="product_id",
-        how="left"
-    )
+        self.daily = daily
+        self.festival = festival
 
-    # ---------- Stock ----------
-    stock_received = inventory.groupby("product_id")["stock_received"].sum()
-    damaged = inventory.groupby("product_id")["damaged_stock"].sum()
+    def add_inventory(self, inventory):
+        with span("inventory", rows=len(inventory)):
+            product_codes, product_ids = pd.factorize(inventory["product_id"], sort=True)
+            keep = product_codes >= 0
 
-    net_stock = (stock_received - damaged).reset_index()
-    net_stock.columns = ["product_id", "net_stock"]
+            stock = pd.DataFrame({
+                col: group_sum(
+                    product_codes[keep],
+                    len(product_ids),
+                    inventory[col].to_numpy()[keep]
+                )
+                for col in ["stock_received", "damaged_stock"]
+            }, index=pd.Index(product_ids, name="product_id"))
 
-    product_features = product_features.merge(
-        net_stock,
-        on="product_id",
-        how="left"
-    )
+            if self.stock is not None:
+                stock = _sum_by_key([self.stock, stock], 0)
 
-    product_features["net_stock"] = product_features["net_stock"].fillna(0)
+        self.stock = stock
 
-    # ---------- Target ----------
-    product_features["future_30_day_demand"] = (
-        product_features["avg_daily_sales"] * 30
-    )
+    def finalize(self, products):
+        if self.daily is None:
+            raise ValueError("No valid order_date data after merge.")
+
+        with span("finalize", rows=len(self.daily)):
+            return self._finalize(products)
+
+    def _finalize(self, products):
+
+        # ---------- Daily Sales (FOR DASHBOARD) ----------
+        daily_sales = self.daily.reset_index()
+
+        if daily_sales.empty:
+            raise ValueError("Daily sales dataframe is empty.")
+
+        # ---------- Aggregated Features (FOR PREDICTION) ----------
+        product_codes, product_ids = pd.factorize(daily_sales["product_id"], sort=True)
+        n_products = len(product_ids)
+
+        avg_daily_sales, sales_volatility = group_mean_std(
+            product_codes, n_products, daily_sales["quantity"].to_numpy()
+        )
+
+        # Festival Aggregation (mean over order lines)
+        festival_pos = self.festival.index.get_indexer(product_ids)
+        line_count = take(
+            self.festival["line_count"].to_numpy(dtype=np.float64), festival_pos, np.nan
+        )
+
+        product_features = pd.DataFrame({
+            "product_id": product_ids,
+            "avg_daily_sales": avg_daily_sales,
+            "sales_volatility": np.nan_to_num(sales_volatility, nan=0.0),
+            **{
+                # festival_score and each category boost
+                col: take(
+                    self.festival[col].to_numpy(dtype=np.float64), festival_pos, np.nan
+                ) / line_count
+                for col in self.festival.columns.drop("line_count")
+            }
+        })
+
+        # ---------- Stock ----------
+        if self.stock is not None:
+            net_stock = (
+                self.stock["stock_received"] - self.stock["damaged_stock"]
+            ).to_numpy()
+            stock_pos = self.stock.index.get_indexer(product_ids)
+
+            if (stock_pos >= 0).all():
+                product_features["net_stock"] = net_stock[stock_pos]
+            else:
+                product_features["net_stock"] = take(
+                    net_stock.astype(np.float64), stock_pos, 0.0
+                )
+        else:
+            product_features["net_stock"] = 0.0
+
+        # ---------- Target ----------
+        product_features["future_30_day_demand"] = (
+            product_features["avg_daily_sales"] * 30
+        )
+
+        # ---------- Product Info ----------
+        product_pos = positions(products["product_id"], product_ids)
+
+        if product_pos is None:
+            # Duplicate product rows: keep the merge's one-row-per-match output
+            product_features = product_features.merge(
+                products[["product_id", "product_name", "category"]],
+                on="product_id",
+                how="left"
+            )
+        else:
+            for col in ["product_name", "category"]:
+                product_features[col] = products[col].array.take(product_pos, allow_fill=True)
+
+        if product_features.empty:
+            raise ValueError("Final product_features is empty.")
 
-    # ---------- Product Info ----------
-    product_features = product_features.merge(
-        products[["product_id", "product_name", "category"]],
-        on="product_id",
-        how="left"
+        return {
+            "aggregated": product_features,
+            "daily_sales": daily_sales
+        }
+
+
+# ---------- Incremental updates ----------
+def _appended_rows(state, sheets, hashes, festival_digest):
+    # Number of leading rows per sheet that are already folded into `state`,
+    # or None when the new upload is not a pure append of the previous one
+    # (edited rows, new festival calendar, ...) and a full rebuild is needed.
+    if state is None or state["festival_digest"] != festival_digest:
+        return None
+
+    for sheet, df in sheets.items():
+        n = state["rows"][sheet]
+        if len(df) < n or rows_digest(hashes[sheet][:n]) != state["digests"][sheet]:
+            return None
+
+    # Appended orders/products must not re-key rows that were already joined
+    orders = sheets["blinkit_orders"]["order_id"]
+    products = sheets["blinkit_products"]["product_id"]
+    n_orders = state["rows"]["blinkit_orders"]
+    n_products = state["rows"]["blinkit_products"]
+
+    if orders.iloc[n_orders:].isin(orders.iloc[:n_orders]).any():
+        return None
+
+    if products.iloc[n_products:].isin(products.iloc[:n_products]).any():
+        return None
+
+    # Lines folded without a category would now pick one up
+    if products.isin(state["unknown_products"]).any():
+        return None
+
+    return state["rows"]
+
+
+def _update_pipeline(state_key, sheets, calendar):
+    with state_lock(state_key):
+        return _fold_update(state_key, sheets, calendar)
+
+
+def _fold_update(state_key, sheets, calendar):
+    festival_digest = calendar.digest
+
+    with span("delta_check"):
+        hashes = {sheet: row_hashes(df) for sheet, df in sheets.items()}
+
+        state = load_state(state_key)
+        rows = _appended_rows(state, sheets, hashes, festival_digest)
+
+    if rows is None:
+        state = {
+            "aggregates": ProductAggregates(),
+            "pending_items": sheets["blinkit_order_items"].iloc[:0],
+            "unknown_products": []
+        }
+        rows = {sheet: 0 for sheet in sheets}
+
+    orders = sheets["blinkit_orders"]
+    products = sheets["blinkit_products"]
+    aggregates = state["aggregates"]
+
+    # Lines whose order had no valid date are retried on every update
+    items = pd.concat([
+        state["pending_items"],
+        sheets["blinkit_order_items"].iloc[rows["blinkit_order_items"]:]
+    ], ignore_index=True)
+
+    dated_orders = orders.loc[orders["order_date"].notna(), "order_id"]
+    pending = ~items["order_id"].isin(dated_orders)
+
+    aggregates.add_order_items(items[~pending], orders, products, calendar)
+    aggregates.add_inventory(
+        sheets["blinkit_inventory"].iloc[rows["blinkit_inventory"]:]
     )
 
-    if product_features.empty:
-        raise ValueError("Final product_features is empty.")
+    unknown = items.loc[~items["product_id"].isin(products["product_id"]), "product_id"]
+
+    save_state(state_key, {
+        "aggregates": aggregates,
+        "pending_items": items[pending],
+        "unknown_products": sorted(set(state["unknown_products"]) | set(unknown.tolist())),
+        "festival_digest": festival_digest,
+        "rows": {sheet: len(df) for sheet, df in sheets.items()},
+        "digests": {sheet: rows_digest(h) for sheet, h in hashes.items()}
+    })
+
+    return aggregates.finalize(products)
+
+
+# ---------- Partitioned builds ----------
+# Default worker count for full (non-streaming, non-incremental) builds
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "1"))
+
+# Partition pools, one per worker count and created on first use, shared by
+# every build in the process. Spawned rather than forked, like the batch
+# prediction pool: builds run inside threaded web workers.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    with _pools_lock:
+        pool = _pools.get(workers)
+
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+        return pool
+
+
+def _reset_pool(workers, pool):
+    # A worker died (e.g. OOM); the next build starts a fresh pool
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+
+    pool.shutdown(wait=False)
+
+
+def _share(arrays):
+    # Copies each array into a SharedMemory block; returns the blocks and
+    # the (name, dtype, length) specs workers use to attach to them
+    blocks, specs = [], []
+
+    for arr in arrays:
+        block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        blocks.append(block)
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)[:] = arr
+        specs.append((block.name, arr.dtype.str, len(arr)))
+
+    return blocks, specs
+
+
+def _fold_partition(specs, lo, hi, calendar):
+    # Pool worker: folds rows [lo, hi) of the shared line arrays and sends
+    # back only the per-key (daily, festival) results
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+
+    try:
+        lines = [
+            np.ndarray((n,), dtype=np.dtype(dtype), buffer=block.buf)[lo:hi]
+            for block, (_, dtype, n) in zip(blocks, specs)
+        ]
+
+        aggregates = ProductAggregates()
+        aggregates.add_lines(*lines, calendar)
+        del lines
+
+        return aggregates.daily, aggregates.festival
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def _build_partitioned(sheets, calendar, workers):
+    # Order lines are split by product_id hash, so every product lands in
+    # exactly one partition and the partial results only need concatenating
+    products = sheets["blinkit_products"]
+
+    with span("merge", rows=len(sheets["blinkit_order_items"])):
+        lines = _order_lines(
+            sheets["blinkit_order_items"], sheets["blinkit_orders"], products, calendar
+        )
+
+    aggregates = ProductAggregates()
+
+    if len(lines[0]) == 0 or any(arr.dtype.kind not in "iufbM" for arr in lines):
+        # Nothing to split, or ids that cannot live in shared memory
+        aggregates.add_lines(*lines, calendar)
+    else:
+        part = pd.util.hash_array(lines[0]) % workers
+        order = np.argsort(part, kind="stable")
+        bounds = np.searchsorted(part[order], np.arange(workers + 1))
+
+        blocks, specs = _share([arr[order] for arr in lines])
+
+        try:
+            pool = _get_pool(workers)
+
+            try:
+                results = list(pool.map(
+                    _fold_partition,
+                    [specs] * workers,
+                    bounds[:-1].tolist(),
+                    bounds[1:].tolist(),
+                    [calendar] * workers
+                ))
+            except BrokenProcessPool:
+                _reset_pool(workers, pool)
+                raise
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        results = [r for r in results if r[0] is not None]
+
+        if results:
+            aggregates.daily = pd.concat([daily for daily, _ in results]).sort_index()
+            aggregates.festival = pd.concat([festival for _, festival in results]).sort_index()
+
+    aggregates.add_inventory(sheets["blinkit_inventory"])
+
+    return aggregates.finalize(products)
+
+
+def build_pipeline(dataset_path: str, streaming=False, chunk_size=50_000, state_key=None,
+                   workers=None):
+    # streaming=True reads order items and inventory in chunks of
+    # chunk_size rows (xlsx, or a directory of per-sheet .csv/.parquet
+    # files) and folds them into ProductAggregates, so the merged
+    # order-line frame never exists in full.
+    #
+    # state_key (e.g. a warehouse code) keeps the folded aggregates on disk
+    # between calls; when the next dataset for that key only appends rows,
+    # just the new order items and inventory rows are folded in.
+    #
+    # workers > 1 splits a full build by product_id hash across a process
+    # pool (defaults to PIPELINE_WORKERS). The joined order-line arrays are
+    # placed in shared memory, so workers attach to them instead of
+    # receiving pickled frames.
+    if workers is None:
+        workers = PIPELINE_WORKERS
+
+    # Compiled once per process (and festival CSV version)
+    calendar = get_calendar(FESTIVAL_PATH)
+    aggregates = ProductAggregates()
+
+    if streaming:
+        orders = read_sheet(dataset_path, "blinkit_orders")
+        products = read_sheet(dataset_path, "blinkit_products")
+
+        for chunk in iter_sheet_chunks(dataset_path, "blinkit_order_items", chunk_size):
+            aggregates.add_order_items(chunk, orders, products, calendar)
+
+        for chunk in iter_sheet_chunks(dataset_path, "blinkit_inventory", chunk_size):
+            aggregates.add_inventory(chunk)
+
+        return aggregates.finalize(products)
+
+    # ---------- Load Excel (via columnar sheet cache) ----------
+    with span("load") as load_span:
+        df_dict = load_sheets(dataset_path)
+        load_span.rows = sum(len(df) for df in df_dict.values())
+
+    if state_key is not None:
+        return _update_pipeline(state_key, df_dict, calendar)
+
+    if workers > 1:
+        return _build_partitioned(df_dict, calendar, workers)
+
+    products = df_dict["blinkit_products"]
+
+    aggregates.add_order_items(
+        df_dict["blinkit_order_items"],
+        df_dict["blinkit_orders"],
+        products,
+        calendar
+    )
+    aggregates.add_inventory(df_dict["blinkit_inventory"])
 
-    return {
-        "aggregated": product_features,
-        "daily_sales": daily_sales
-    }
\ No newline at end of file
+    return aggregates.finalize(products)
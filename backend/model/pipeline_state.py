@@ -0,0 +1,87 @@
+import os
+import uuid
+import pickle
+import hashlib
+import threading
+import pandas as pd
+
+BASE_DIR = os.path.dirname(__file__)
+
+# Persistent per-warehouse aggregate state for incremental pipeline runs.
+# Bump STATE_VERSION whenever ProductAggregates or the feature logic changes,
+# so stale pickles are ignored instead of being folded into.
+STATE_VERSION = 2
+
+STATE_DIR = os.getenv(
+    "PIPELINE_STATE_DIR",
+    os.path.join(BASE_DIR, "..", "instance", "pipeline_state")
+)
+
+# One lock per state_key: a load -> fold -> save update holds it throughout,
+# so two uploads for the same warehouse do not fold from the same old state
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def state_lock(state_key):
+    with _locks_lock:
+        return _locks.setdefault(str(state_key), threading.Lock())
+
+
+def row_hashes(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def rows_digest(hashes):
+    # Content hash of a run of rows (from row_hashes), used to check that a
+    # new upload only appended rows to what was folded in last time
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+
+def _state_path(state_key):
+    safe_key = "".join(
+        c if c.isalnum() or c in "-_" else "_" for c in str(state_key)
+    )
+    return os.path.join(STATE_DIR, f"{safe_key}.pkl")
+
+
+def load_state(state_key):
+    path = _state_path(state_key)
+
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except Exception as e:
+        print("⚠️ Ignoring unreadable pipeline state:", str(e))
+        return None
+
+    if state.get("version") != STATE_VERSION:
+        return None
+
+    return state
+
+
+def save_state(state_key, state):
+    path = _state_path(state_key)
+    os.makedirs(STATE_DIR, exist_ok=True)
+
+    # Unique per call, so concurrent writers never share a temp file
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(dict(state, version=STATE_VERSION), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def clear_state(state_key):
+    path = _state_path(state_key)
+
+    if os.path.exists(path):
+        os.remove(path)
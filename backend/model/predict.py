@@ -1,70 +1,228 @@
 import os
-import joblib
+import itertools
+import threading
+import multiprocessing
 import pandas as pd
-import numpy as np
-from datetime import datetime
-from .pipeline import build_pipeline
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from .feature_store import get_features
+from .model_registry import get_model
+from .instrumentation import span
+from .stockout import stockout_kernel, as_dates, status_labels
 
-BASE_DIR = os.path.dirname(__file__)
-MODEL_PATH = os.path.join(BASE_DIR, "demand_model.pkl")
+FEATURES = [
+    "avg_daily_sales",
+    "sales_volatility",
+    "festival_score",
+    "festival_electronics_boost",
+    "net_stock"
+]
 
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError("Model file not found. Train the model first.")
 
-model = joblib.load(MODEL_PATH)
-
-
-def predict_stockout(input_file):
-
-    # Run updated pipeline
-    pipeline_output = build_pipeline(input_file)
-
-    # Use only aggregated features for prediction
-    final_df = pipeline_output["aggregated"]
-
-    features = [
-        "avg_daily_sales",
-        "sales_volatility",
-        "festival_score",
-        "festival_electronics_boost",
-        "net_stock"
-    ]
+def _feature_matrix(final_df):
 
     # Ensure required features exist
-    for col in features:
+    for col in FEATURES:
         if col not in final_df.columns:
             raise ValueError(f"Missing required column: {col}")
 
     # Prepare feature matrix
-    X_new = final_df[features].fillna(0)
+    X_new = final_df[FEATURES].fillna(0)
 
     if X_new.empty:
         raise ValueError("No data available for prediction.")
 
-    # Model prediction
-    predicted_30_day_demand = model.predict(X_new)
+    return X_new
 
-    # Convert to daily demand (minimum safeguard)
-    predicted_daily_demand = predicted_30_day_demand / 30
-    predicted_daily_demand = np.maximum(predicted_daily_demand, 0.1)
 
-    # Calculate stockout days
-    stockout_days = final_df["net_stock"] / predicted_daily_demand
-    stockout_days = stockout_days.clip(lower=0).astype(int)
+def _stockout_result(final_df, predicted_30_day_demand):
 
-    # Calculate stockout date
-    predicted_stockout_date = (
-        pd.Timestamp(datetime.today().date()) +
-        pd.to_timedelta(stockout_days, unit="D")
+    _, days_left, stockout_day, status = stockout_kernel(
+        predicted_30_day_demand, final_df["net_stock"]
     )
 
-    # Final result
+    # Final result; stockout_date stays a date column until serialization
     result = pd.DataFrame({
         "product_id": final_df["product_id"],
         "product_name": final_df["product_name"],
         "category": final_df["category"],
-        "days_left": stockout_days,
-        "stockout_date": predicted_stockout_date.astype(str)
+        "days_left": days_left,
+        "stock_status": status_labels(status),
+        "stockout_date": as_dates(stockout_day)
+    })
+
+    return result
+
+
+def predict_stockout(input_file, state_key=None, sha256=None, source_name=None):
+
+    # Aggregated features from the feature store; a dataset seen before is
+    # a snapshot read, otherwise the pipeline runs (incremental when a
+    # state_key is given). sha256 skips re-hashing an already hashed upload;
+    # source_name (the uploaded file name) is what the snapshot records.
+    with span("features"):
+        final_df = get_features(
+            input_file, sha256=sha256, state_key=state_key, source_name=source_name
+        )
+
+    X_new = _feature_matrix(final_df)
+
+    # Model prediction
+    with span("model_predict", rows=len(X_new)):
+        predicted_30_day_demand = get_model().predict(X_new)
+
+    with span("stockout_result", rows=len(X_new)):
+        return _stockout_result(final_df, predicted_30_day_demand)
+
+
+# ---------- Per-product forecast table (dashboard) ----------
+def forecast_products(final_df, today=None):
+    # One vectorized prediction for every product in an "aggregated" frame,
+    # with the fields the dashboard shows; same stockout math as /predict
+    final_df = final_df.drop_duplicates("product_id").reset_index(drop=True)
+
+    X_new = _feature_matrix(final_df)
+
+    predicted_daily_demand, days_left, stockout_day, status = stockout_kernel(
+        get_model().predict(X_new), final_df["net_stock"], today=today
+    )
+
+    return pd.DataFrame({
+        "product_id": final_df["product_id"].astype(int),
+        "product_name": final_df["product_name"],
+        "category": final_df["category"],
+        "avg_daily_sales": final_df["avg_daily_sales"].astype(float),
+        "predicted_daily_demand": predicted_daily_demand,
+        "days_left": days_left,
+        "stock_status": status_labels(status),
+        "stockout_date": as_dates(stockout_day).astype(object)
     })
 
-    return result
\ No newline at end of file
+
+# ---------- Batch prediction ----------
+# One pool per process, shared by every /predict-batch request, so worker
+# count stays bounded however many batches run at once. Workers are spawned
+# rather than forked: the web worker has threads (scheduler, outbox) and
+# forking it can copy a held lock into the child.
+BATCH_WORKERS = int(os.getenv("PREDICT_BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+
+def _get_batch_pool():
+    global _batch_pool
+
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _batch_pool
+
+
+def _reset_batch_pool(pool):
+    # A worker died (e.g. OOM); the next batch starts a fresh pool
+    global _batch_pool
+
+    with _batch_pool_lock:
+        if _batch_pool is pool:
+            _batch_pool = None
+
+    pool.shutdown(wait=False)
+
+
+def _aggregated_features(input_file, source_name=None):
+    # Runs in a pool worker; only the small per-product frame is sent back
+    return get_features(input_file, source_name=source_name)
+
+
+def _submit_features(dataset_path, source_name):
+    # Queues one dataset on the batch pool, replacing a pool a dead worker broke
+    pool = _get_batch_pool()
+
+    try:
+        return pool, pool.submit(_aggregated_features, dataset_path, source_name)
+    except BrokenProcessPool:
+        _reset_batch_pool(pool)
+        pool = _get_batch_pool()
+        return pool, pool.submit(_aggregated_features, dataset_path, source_name)
+
+
+def predict_stockout_batch(datasets, max_workers=None, source_names=None):
+    # datasets maps a key (e.g. warehouse code) to a dataset path;
+    # source_names optionally maps keys to what feature snapshots record as
+    # their dataset (the uploaded file names, when the paths are temp files).
+    # Pipelines run in the shared batch pool, at most max_workers of this
+    # batch's datasets at a time (in-process when max_workers <= 1), then
+    # every warehouse's features go through a single model.predict call.
+    #
+    # Returns (results, errors): key -> result DataFrame (same columns as
+    # predict_stockout), and key -> error message for datasets that failed.
+    keys = list(datasets)
+    source_names = source_names or {}
+    frames = {}
+    errors = {}
+
+    if max_workers is None:
+        max_workers = min(len(keys), BATCH_WORKERS)
+
+    if max_workers <= 1:
+        for key in keys:
+            try:
+                frames[key] = _aggregated_features(datasets[key], source_names.get(key))
+            except Exception as e:
+                errors[key] = str(e)
+    else:
+        queue = iter(keys)
+        running = {}
+
+        while True:
+            for key in itertools.islice(queue, max_workers - len(running)):
+                pool, future = _submit_features(datasets[key], source_names.get(key))
+                running[future] = (key, pool)
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                key, pool = running.pop(future)
+
+                try:
+                    frames[key] = future.result()
+                except BrokenProcessPool as e:
+                    _reset_batch_pool(pool)
+                    errors[key] = str(e)
+                except Exception as e:
+                    errors[key] = str(e)
+
+        # Back in the caller's order
+        frames = {key: frames[key] for key in keys if key in frames}
+
+    matrices = {}
+    for key, final_df in frames.items():
+        try:
+            matrices[key] = _feature_matrix(final_df)
+        except ValueError as e:
+            errors[key] = str(e)
+
+    results = {}
+
+    if not matrices:
+        return results, errors
+
+    X_all = pd.concat(matrices.values(), ignore_index=True)
+    predicted_30_day_demand = get_model().predict(X_all)
+
+    offset = 0
+    for key, X_new in matrices.items():
+        end = offset + len(X_new)
+        results[key] = _stockout_result(
+            frames[key], predicted_30_day_demand[offset:end]
+        )
+        offset = end
+
+    return results, errors
@@ -0,0 +1,139 @@
+import os
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from .stockout import as_dates, day_number
+
+# On-disk cache of /predict results, keyed by the upload's content hash, the
+# served model's version and the festival calendar, so a re-uploaded
+# workbook skips the pipeline and the model. Entries are Feather files under
+# CACHE_DIR:
+#   mtime = when the entry was written (TTL)
+#   atime = last hit (LRU; set explicitly, so mount options do not matter)
+# Writes evict expired entries, then least recently used ones until the
+# directory is under MAX_BYTES.
+CACHE_DIR = os.getenv(
+    "RESULT_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "instance", "result_cache")
+)
+MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+_evict_lock = threading.Lock()
+
+
+def save_upload(file_storage, suffix=".xlsx", chunk_size=1 << 20):
+    # Streams an uploaded file to a temp file, hashing it on the way.
+    # Returns (path, sha256); the caller removes the file.
+    digest = hashlib.sha256()
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        for chunk in iter(lambda: file_storage.stream.read(chunk_size), b""):
+            digest.update(chunk)
+            tmp.write(chunk)
+
+    return tmp.name, digest.hexdigest()
+
+
+def cache_key(upload_sha256, *versions):
+    # versions: whatever else the result depends on (model, festival calendar)
+    return hashlib.sha256(":".join((upload_sha256,) + versions).encode()).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.feather")
+
+
+def get_result(key):
+    # Cached result frame or None. stockout_date is re-derived from
+    # days_left, so an entry written yesterday still dates from today.
+    path = _entry_path(key)
+
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    now = time.time()
+
+    if now - st.st_mtime > TTL_SECONDS:
+        _remove(path)
+        return None
+
+    try:
+        result = pd.read_feather(path)
+    except (OSError, ValueError):
+        # Evicted or replaced while being read
+        return None
+
+    os.utime(path, (now, st.st_mtime))
+
+    days_left = result["days_left"].to_numpy(dtype=np.int64)
+    result["stockout_date"] = as_dates(days_left + day_number())
+    return result
+
+
+def put_result(key, result):
+    # True once stored; a failed write (disk full, read-only instance dir)
+    # only costs the cache, never the request that produced the result
+    tmp = os.path.join(CACHE_DIR, f".{key}.{uuid.uuid4().hex}.tmp")
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+
+        # Write-then-rename, so readers never see a partial file
+        result.reset_index(drop=True).to_feather(tmp)
+        os.replace(tmp, _entry_path(key))
+
+        _evict()
+    except OSError as e:
+        print("⚠️ Could not write result cache:", str(e))
+        _remove(tmp)
+        return False
+
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _evict():
+    with _evict_lock:
+        now = time.time()
+        entries = []
+
+        with os.scandir(CACHE_DIR) as it:
+            for entry in it:
+                if not entry.name.endswith(".feather"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+
+                if now - st.st_mtime > TTL_SECONDS:
+                    _remove(entry.path)
+                else:
+                    entries.append((st.st_atime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= MAX_BYTES:
+                break
+            _remove(path)
+            total -= size
+
+
+def clear_result_cache():
+    if os.path.isdir(CACHE_DIR):
+        for name in os.listdir(CACHE_DIR):
+            _remove(os.path.join(CACHE_DIR, name))
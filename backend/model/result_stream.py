@@ -0,0 +1,103 @@
+import json
+import numpy as np
+import pandas as pd
+from .stockout import format_dates
+
+# Streams a prediction result frame as JSON or NDJSON straight from its
+# columns. Rows are encoded CHUNK_ROWS at a time, so response memory is one
+# chunk of strings no matter how many products the result has, and the
+# first bytes go out before the rest is encoded.
+
+CHUNK_ROWS = 5_000
+MAX_PAGE_ROWS = 100_000
+
+
+def select_columns(df, fields=None):
+    # fields: comma-separated column names (None/"" keeps all of them)
+    if not fields:
+        return df
+
+    columns = [name.strip() for name in fields.split(",")]
+
+    if not all(columns):
+        raise ValueError("fields must be a comma-separated list of column names")
+
+    unknown = [name for name in columns if name not in df.columns]
+
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    return df[columns]
+
+
+def _parse_int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer") from None
+
+
+def page(df, cursor=None, limit=None):
+    # (rows, next_cursor); the cursor is the row offset of the next page,
+    # None once the last row has been returned
+    start = _parse_int(cursor, "cursor") if cursor else 0
+    limit = MAX_PAGE_ROWS if limit is None else _parse_int(limit, "limit")
+
+    if start < 0 or limit <= 0:
+        raise ValueError("cursor must be >= 0 and limit > 0")
+
+    end = min(start + min(limit, MAX_PAGE_ROWS), len(df))
+    next_cursor = str(end) if end < len(df) else None
+
+    return df.iloc[start:end], next_cursor
+
+
+def _encode_column(values):
+    # JSON text of every value in one column chunk
+    if values.dtype.kind in "iub":
+        return [json.dumps(v) for v in values.tolist()]
+
+    if values.dtype.kind == "f":
+        return [json.dumps(v) if v == v else "null" for v in values.tolist()]
+
+    if values.dtype.kind == "M":
+        values = format_dates(values)
+
+    return [
+        "null" if v is None or v is pd.NaT or (isinstance(v, float) and v != v)
+        else json.dumps(v if isinstance(v, (str, int, float, bool)) else str(v))
+        for v in values.tolist()
+    ]
+
+
+def iter_rows(df):
+    # One JSON object string per row, in column order
+    prefixes = [json.dumps(name) + ":" for name in df.columns]
+    prefixes = ["{" + prefixes[0]] + ["," + p for p in prefixes[1:]]
+
+    for lo in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[lo:lo + CHUNK_ROWS]
+        columns = [_encode_column(np.asarray(chunk[name])) for name in df.columns]
+
+        yield [
+            "".join(p + v for p, v in zip(prefixes, row)) + "}"
+            for row in zip(*columns)
+        ]
+
+
+def stream_ndjson(df):
+    for rows in iter_rows(df):
+        yield "\n".join(rows) + "\n"
+
+
+def stream_json(df, **header):
+    # {**header, "fields": [...]} with the rows written chunk by chunk
+    head = json.dumps(header, default=str)
+    yield head[:-1] + (", " if header else "") + '"fields": ['
+
+    first = True
+    for rows in iter_rows(df):
+        yield ("" if first else ",") + ",".join(rows)
+        first = False
+
+    yield "]}"
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+FREQUENCIES = ("day", "week", "month")
+
+
+def _buckets(days, freq):
+    # Start of the day/week (Monday)/month bucket for each datetime64[D]
+    if freq == "day":
+        return days
+
+    if freq == "week":
+        # 1970-01-01 was a Thursday, so Mondays are ordinals with (d + 3) % 7 == 0
+        ordinals = days.astype(np.int64)
+        return (ordinals - (ordinals + 3) % 7).astype("datetime64[D]")
+
+    if freq == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+
+    raise ValueError(f"Unsupported freq: {freq} (expected one of {', '.join(FREQUENCIES)})")
+
+
+class SeriesStore:
+    # Per-product daily sales history built once from the pipeline's
+    # "daily_sales" frame. All products share three flat arrays sorted by
+    # (product_id, day); each product owns one contiguous slice, so a range
+    # query is a dict lookup plus two binary searches.
+
+    def __init__(self, daily_sales):
+        daily = daily_sales.dropna(subset=["order_date"])
+        daily = daily.assign(day=daily["order_date"].dt.floor("D"))
+        daily = daily.groupby(["product_id", "day"])["quantity"].sum().reset_index()
+
+        self._days = daily["day"].to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+        self._quantity = daily["quantity"].to_numpy(dtype=np.float64)
+
+        product_ids = daily["product_id"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, product_ids[1:] != product_ids[:-1]])[:len(daily)]
+        ends = np.r_[starts[1:], len(daily)]
+
+        self._spans = {
+            int(product_ids[lo]): (int(lo), int(hi))
+            for lo, hi in zip(starts, ends)
+        }
+
+        self.first_day = self._days.min() if len(daily) else None
+        self.last_day = self._days.max() if len(daily) else None
+
+    def __contains__(self, product_id):
+        return int(product_id) in self._spans
+
+    def query(self, product_id, start=None, end=None, freq="day"):
+        # Sales of one product between start and end (inclusive dates),
+        # summed per day/week/month. Buckets with no sales are reported as
+        # 0, so the result covers the whole requested window.
+        # Returns None for an unknown product.
+        span = self._spans.get(int(product_id))
+
+        if span is None:
+            return None
+
+        lo, hi = span
+        days = self._days[lo:hi]
+        quantity = self._quantity[lo:hi]
+
+        start = days[0] if start is None else np.datetime64(start, "D")
+        end = days[-1] if end is None else np.datetime64(end, "D")
+
+        if start > end:
+            return []
+
+        i = np.searchsorted(days, start, side="left")
+        j = np.searchsorted(days, end, side="right")
+
+        first = _buckets(np.array([start]), freq)[0]
+        last = _buckets(np.array([end]), freq)[0]
+
+        if freq == "month":
+            labels = np.arange(
+                first.astype("datetime64[M]"),
+                last.astype("datetime64[M]") + 1
+            ).astype("datetime64[D]")
+        else:
+            step = 7 if freq == "week" else 1
+            labels = np.arange(first, last + 1, step)
+
+        totals = np.zeros(len(labels), dtype=np.float64)
+
+        if j > i:
+            positions = np.searchsorted(labels, _buckets(days[i:j], freq))
+            totals += np.bincount(positions, weights=quantity[i:j], minlength=len(labels))
+
+        return [
+            {"date": label, "quantity": value}
+            for label, value in zip(labels.astype(str).tolist(), totals.tolist())
+        ]
+
+
+def parse_day(value):
+    # "YYYY-MM-DD" (or None) -> numpy day; raises ValueError on bad input
+    if value is None or value == "":
+        return None
+
+    return np.datetime64(pd.Timestamp(value).date(), "D")
@@ -0,0 +1,66 @@
+import numpy as np
+from datetime import date
+
+# Stockout math shared by /predict (and the batch/job routes) and the
+# dashboard forecast table: predicted 30-day demand + net stock in, whole
+# arrays out, no per-row Python. Dates stay int-encoded (days since
+# 1970-01-01) until a response is serialized.
+
+MIN_DAILY_DEMAND = 0.1
+# days_left is capped at a century so day numbers remain valid dates
+MAX_DAYS_LEFT = 36_500
+
+# Thresholds on days_left for the stock status
+UNDERSTOCK_DAYS = 7
+OVERSTOCK_DAYS = 60
+
+UNDERSTOCK, FINE, OVERSTOCK = 0, 1, 2
+STATUS_LABELS = np.array(["Understock", "Fine", "Overstock"], dtype=object)
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def day_number(day=None):
+    # date (default today) -> days since 1970-01-01
+    return int((np.datetime64(day or date.today(), "D") - _EPOCH).astype(np.int64))
+
+
+def stockout_kernel(predicted_30_day_demand, net_stock, today=None,
+                    understock_days=UNDERSTOCK_DAYS, overstock_days=OVERSTOCK_DAYS):
+    # Returns (daily_demand float64, days_left int32, stockout_day int32,
+    # status int8). Missing stock counts as 0 and days_left is clipped at 0,
+    # so a product already out of stock runs out today.
+    daily = np.asarray(predicted_30_day_demand, dtype=np.float64) / 30
+    np.fmax(daily, MIN_DAILY_DEMAND, out=daily)
+
+    days = np.nan_to_num(np.asarray(net_stock, dtype=np.float64), nan=0.0) / daily
+    np.clip(days, 0, MAX_DAYS_LEFT, out=days)
+    days_left = days.astype(np.int32)
+
+    stockout_day = days_left + np.int32(day_number(today))
+
+    status = (days_left >= understock_days).astype(np.int8)
+    status += days_left > overstock_days
+
+    return daily, days_left, stockout_day, status
+
+
+def as_dates(day_numbers):
+    # int-encoded days -> datetime64[D] (a view, no copy)
+    return np.asarray(day_numbers, dtype=np.int64).view("datetime64[D]")
+
+
+def format_dates(values):
+    # datetime64 / int-encoded days -> "YYYY-MM-DD" strings (None for NaT)
+    values = np.asarray(values)
+
+    if values.dtype.kind != "M":
+        values = as_dates(values)
+
+    text = np.datetime_as_string(values.astype("datetime64[D]"), unit="D").astype(object)
+    text[np.isnat(values)] = None
+    return text
+
+
+def status_labels(status):
+    return STATUS_LABELS[status]
@@ -1,41 +1,148 @@
 import os
-import joblib
+import json
+import time
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
 import xgboost as xgb
-from sklearn.model_selection import train_test_split
-from .pipeline import build_pipeline
+from .feature_store import get_features
+from .predict import FEATURES
+from .model_registry import MODEL_PATH, NATIVE_MODEL_PATH, get_model, save_model
 
 BASE_DIR = os.path.dirname(__file__)
 dataset_path = os.path.join(BASE_DIR, "blinkit sales dataset.xlsx")
 
-pipeline_output = build_pipeline(dataset_path)
-final_df = pipeline_output["aggregated"]
+target = "future_30_day_demand"
 
-features = [
-    "avg_daily_sales",
-    "sales_volatility",
-    "festival_score",
-    "festival_electronics_boost",
-    "net_stock"
-]
+# Shared by full refits and warm starts (continued boosting must keep them)
+MODEL_PARAMS = {
+    "learning_rate": 0.05,
+    "max_depth": 6,
+    "tree_method": "hist"
+}
+FULL_ROUNDS = 400
+# Trees appended per warm-start run, and the size at which a warm start
+# turns into a full refit so prediction cost does not grow without bound
+WARM_ROUNDS = 50
+MAX_TREES = 1000
 
-target = "future_30_day_demand"
+# Products whose id hashes to bucket 0 of HOLDOUT_BUCKETS are never
+# trained on. The split is the same every run, so a warm-started booster
+# is still scored on products none of its earlier trees have seen.
+HOLDOUT_BUCKETS = 5
+
+# One JSON line per training run
+RUNS_PATH = os.path.join(BASE_DIR, "..", "instance", "training_runs.jsonl")
+# Written by model.tune; overrides MODEL_PARAMS/FULL_ROUNDS when present
+BEST_PARAMS_PATH = os.path.join(BASE_DIR, "..", "instance", "tuning", "best_params.json")
+
+
+def model_params():
+    # (params, full_rounds), taking the last tuning result into account
+    params, full_rounds = dict(MODEL_PARAMS), FULL_ROUNDS
+
+    if os.path.exists(BEST_PARAMS_PATH):
+        with open(BEST_PARAMS_PATH) as f:
+            tuned = json.load(f)
+        full_rounds = tuned.pop("n_estimators", FULL_ROUNDS)
+        params.update(tuned)
+
+    return params, full_rounds
+
+
+def load_features(path=dataset_path, state_key="training"):
+    # Unchanged workbooks are read from the feature store; otherwise the
+    # state_key reuses the folded aggregates from the previous run, so a
+    # workbook that only grew since last night is not re-aggregated
+    final_df = get_features(path, state_key=state_key).set_index("product_id")
+
+    X = final_df[FEATURES].fillna(0)
+    y = final_df[target]
+
+    return X, y
+
+
+def holdout_mask(product_ids):
+    # True for the fixed validation products
+    ids = np.asarray(product_ids, dtype=np.int64)
+    return pd.util.hash_array(ids) % HOLDOUT_BUCKETS == 0
+
+
+def _record_run(run):
+    os.makedirs(os.path.dirname(RUNS_PATH), exist_ok=True)
+
+    with open(RUNS_PATH, "a") as f:
+        f.write(json.dumps(run) + "\n")
+
+
+def train(path=dataset_path, warm_start=True, rounds=WARM_ROUNDS, nthread=None,
+          state_key="training"):
+    X, y = load_features(path, state_key=state_key)
+
+    holdout = holdout_mask(X.index)
+    X_train, X_test = X[~holdout], X[holdout]
+    y_train, y_test = y[~holdout], y[holdout]
+
+    params, full_rounds = model_params()
+
+    base = None
+    if warm_start and (os.path.exists(NATIVE_MODEL_PATH) or os.path.exists(MODEL_PATH)):
+        base = get_model().get_booster()
+
+        if base.num_boosted_rounds() + rounds > MAX_TREES:
+            base = None
+
+    model = xgb.XGBRegressor(
+        n_estimators=rounds if base is not None else full_rounds,
+        n_jobs=nthread,
+        **params
+    )
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train, xgb_model=base)
+    train_seconds = time.perf_counter() - start
+
+    error = model.predict(X_test) - y_test.to_numpy()
+
+    save_model(model)
+
+    run = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "mode": "warm_start" if base is not None else "full",
+        "rows": len(X),
+        "holdout_rows": len(X_test),
+        "rounds_added": model.get_params()["n_estimators"],
+        "total_trees": model.get_booster().num_boosted_rounds(),
+        "train_seconds": train_seconds,
+        "val_rmse": float(np.sqrt(np.mean(error ** 2))),
+        "val_mae": float(np.mean(np.abs(error)))
+    }
+    _record_run(run)
+
+    return model, run
 
-X = final_df[features].fillna(0)
-y = final_df[target]
 
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the demand model")
+    parser.add_argument("--dataset", default=dataset_path)
+    parser.add_argument("--full", action="store_true", help="refit from scratch")
+    parser.add_argument("--rounds", type=int, default=WARM_ROUNDS)
+    parser.add_argument("--nthread", type=int, default=None)
+    args = parser.parse_args(argv)
 
-model = xgb.XGBRegressor(
-    n_estimators=400,
-    learning_rate=0.05,
-    max_depth=6
-)
+    _, run = train(
+        args.dataset,
+        warm_start=not args.full,
+        rounds=args.rounds,
+        nthread=args.nthread
+    )
 
-model.fit(X_train, y_train)
+    print(
+        f"✅ Model trained successfully ({run['mode']}, {run['total_trees']} trees, "
+        f"{run['train_seconds']:.2f}s, val RMSE {run['val_rmse']:.3f})"
+    )
 
-model_path = os.path.join(BASE_DIR, "demand_model.pkl")
-joblib.dump(model, model_path)
 
-print("✅ Model trained successfully.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
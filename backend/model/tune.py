@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import KFold
+from .train import dataset_path, load_features, holdout_mask, MODEL_PARAMS, BEST_PARAMS_PATH, train
+
+BASE_DIR = os.path.dirname(__file__)
+
+# K-fold grid search over the demand model's XGBoost parameters.
+#
+# Every pool worker builds the fold QuantileDMatrix objects once (in its
+# initializer) and reuses them for all the trials it runs, so the quantile
+# sketch is computed once per fold per worker rather than per trial.
+# Finished trials are appended to a JSONL file keyed by the data and fold
+# setup; a restarted search skips every trial already in it.
+#
+#   python -m model.tune [--folds 5] [--workers N] [--train-best]
+#
+# The aggregated features have one row per product and no time axis, so
+# folds are shuffled K-fold rather than time-based splits. The trainer's
+# holdout products are left out, so its validation score stays unseen.
+
+PARAM_GRID = {
+    "max_depth": [4, 6, 8],
+    "learning_rate": [0.03, 0.05, 0.1],
+    "min_child_weight": [1, 5],
+    "subsample": [0.8, 1.0]
+}
+
+NUM_BOOST_ROUND = 1000
+EARLY_STOPPING_ROUNDS = 50
+# Bins of the shared quantile sketch (fixed, since it is built once)
+MAX_BIN = 256
+# A trial stops after any fold once its running mean RMSE is this much
+# worse than the best finished trial's over the same folds
+PRUNE_MARGIN = 0.25
+
+RESULTS_DIR = os.path.join(BASE_DIR, "..", "instance", "tuning")
+
+_worker = {}
+
+
+def _init_worker(X, y, n_folds, seed):
+    folds = []
+
+    for train_idx, valid_idx in KFold(n_folds, shuffle=True, random_state=seed).split(X):
+        dtrain = xgb.QuantileDMatrix(X[train_idx], y[train_idx], max_bin=MAX_BIN)
+        dvalid = xgb.QuantileDMatrix(X[valid_idx], y[valid_idx], ref=dtrain)
+        folds.append((dtrain, dvalid))
+
+    _worker["folds"] = folds
+
+
+def _run_trial(params, prune_above):
+    booster_params = {
+        **MODEL_PARAMS,
+        "objective": "reg:squarederror",
+        "eval_metric": "rmse",
+        "max_bin": MAX_BIN,
+        "nthread": 1,
+        **params
+    }
+
+    start = time.perf_counter()
+    scores, rounds = [], []
+
+    for dtrain, dvalid in _worker["folds"]:
+        booster = xgb.train(
+            booster_params,
+            dtrain,
+            num_boost_round=NUM_BOOST_ROUND,
+            evals=[(dvalid, "valid")],
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+            verbose_eval=False
+        )
+        scores.append(booster.best_score)
+        rounds.append(booster.best_iteration + 1)
+
+        if prune_above is not None and np.mean(scores) > prune_above[len(scores) - 1]:
+            break
+
+    return {
+        "params": params,
+        "status": "complete" if len(scores) == len(_worker["folds"]) else "pruned",
+        "rmse": float(np.mean(scores)),
+        "rmse_std": float(np.std(scores)),
+        "fold_rmse": scores,
+        "folds_run": len(scores),
+        "n_estimators": int(round(np.mean(rounds))),
+        "seconds": time.perf_counter() - start
+    }
+
+
+def _trial_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def _results_path(X, y, n_folds, seed):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    digest.update(f"{n_folds}:{seed}:{MAX_BIN}".encode())
+    return os.path.join(RESULTS_DIR, f"{digest.hexdigest()[:16]}.jsonl")
+
+
+def _load_results(path):
+    if not os.path.exists(path):
+        return {}
+
+    results = {}
+    with open(path) as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # Torn last line from an interrupted run
+                continue
+            results[_trial_key(row["params"])] = row
+
+    return results
+
+
+def search(X, y, grid=None, n_folds=5, workers=None, seed=42):
+    # Returns every trial (resumed + new) as a DataFrame, best first
+    grid = grid or PARAM_GRID
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+
+    path = _results_path(X, y, n_folds, seed)
+    results = _load_results(path)
+
+    trials = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    pending = [t for t in trials if _trial_key(t) not in results]
+
+    if pending:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        workers = workers or os.cpu_count() or 1
+
+        def prune_thresholds():
+            done = [r for r in results.values() if r["status"] == "complete"]
+            if not done:
+                return None
+            folds = min(done, key=lambda r: r["rmse"])["fold_rmse"]
+            running = np.cumsum(folds) / np.arange(1, len(folds) + 1)
+            return (running * (1 + PRUNE_MARGIN)).tolist()
+
+        with open(path, "a") as log, ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(X, y, n_folds, seed)
+        ) as pool:
+            queue = iter(pending)
+            running = set()
+
+            while True:
+                # Keep a short queue so prune thresholds stay current
+                for params in itertools.islice(queue, workers * 2 - len(running)):
+                    running.add(pool.submit(_run_trial, params, prune_thresholds()))
+
+                if not running:
+                    break
+
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+                    row = future.result()
+                    results[_trial_key(row["params"])] = row
+                    log.write(json.dumps(row) + "\n")
+                    log.flush()
+
+    table = pd.DataFrame([results[_trial_key(t)] for t in trials])
+    return table.sort_values(["status", "rmse"]).reset_index(drop=True)
+
+
+def save_best(table):
+    best = table[table["status"] == "complete"].iloc[0]
+    params = dict(best["params"], n_estimators=int(best["n_estimators"]))
+
+    os.makedirs(os.path.dirname(BEST_PARAMS_PATH), exist_ok=True)
+    with open(BEST_PARAMS_PATH, "w") as f:
+        json.dump(params, f, indent=2)
+
+    return params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune the demand model")
+    parser.add_argument("--dataset", default=dataset_path)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--train-best", action="store_true",
+                        help="refit the served model with the best parameters")
+    args = parser.parse_args(argv)
+
+    X, y = load_features(args.dataset)
+    keep = ~holdout_mask(X.index)
+    table = search(X[keep], y[keep], n_folds=args.folds, workers=args.workers, seed=args.seed)
+
+    with pd.option_context("display.width", 160, "display.max_colwidth", 80):
+        print(table.head(10).to_string())
+
+    params = save_best(table)
+    print("✅ Best parameters written to", BEST_PARAMS_PATH, params)
+
+    if args.train_best:
+        _, run = train(args.dataset, warm_start=False)
+        print(f"✅ Model refit with tuned parameters (val RMSE {run['val_rmse']:.3f})")
+
+
+if __name__ == "__main__":
+    main()
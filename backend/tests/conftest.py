@@ -0,0 +1,43 @@
+import os
+import sys
+
+# Tests import the backend packages (model, app) the way the app does
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+DATASET_PATH = os.path.join(BACKEND_DIR, "model", "blinkit sales dataset.xlsx")
+
+
+@pytest.fixture
+def feature_store(tmp_path, monkeypatch):
+    # The feature store on an empty temp dir, with nothing loaded
+    from model import feature_store
+
+    monkeypatch.setattr(feature_store, "STORE_DIR", str(tmp_path / "feature_store"))
+    feature_store.clear_feature_store()
+    yield feature_store
+    feature_store.clear_feature_store()
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    # The Flask app on a throwaway SQLite database, result cache and
+    # feature store (importing it starts no outbox worker)
+    tmp = tmp_path_factory.mktemp("app")
+    os.environ["DATABASE_URL"] = "sqlite:///" + str(tmp / "test.db")
+
+    from model import feature_store, result_cache
+
+    feature_store.STORE_DIR = str(tmp / "feature_store")
+    result_cache.CACHE_DIR = str(tmp / "result_cache")
+
+    import app as app_module
+    return app_module
+
+
+@pytest.fixture
+def client(app_module):
+    app_module.app.config["TESTING"] = True
+    return app_module.app.test_client()
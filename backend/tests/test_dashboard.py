@@ -0,0 +1,44 @@
+import threading
+
+from conftest import DATASET_PATH
+
+
+def test_concurrent_cold_requests_rebuild_forecasts_once(app_module, client, monkeypatch):
+    with app_module.app.app_context():
+        app_module.ProductForecast.query.delete()
+        app_module.db.session.commit()
+
+    monkeypatch.setattr(app_module, "DASHBOARD_DATASET_PATH", DATASET_PATH)
+
+    calls = []
+    forecast_products = app_module.forecast_products
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return forecast_products(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, "forecast_products", counted)
+
+    with app_module.app.app_context():
+        product_id = int(app_module.get_features(DATASET_PATH)["product_id"].iloc[0])
+
+    barrier = threading.Barrier(8)
+    statuses = []
+
+    def request():
+        barrier.wait()
+        statuses.append(client.get(f"/product-dashboard/{product_id}").status_code)
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200] * 8
+    assert len(calls) == 1
+
+    with app_module.app.app_context():
+        assert app_module.ProductForecast.query.count() == app_module.ProductForecast.query.filter_by(
+            dataset_sha256=app_module.dataset_sha256(DATASET_PATH)
+        ).count() > 0
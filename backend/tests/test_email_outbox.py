@@ -0,0 +1,120 @@
+import socket
+from datetime import datetime, timedelta
+import pytest
+from aiosmtpd.controller import Controller
+
+
+class Sink:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def outbox(app_module, monkeypatch):
+    # The app's outbox pointed at an aiosmtpd sink, with an empty queue
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=free_port())
+    controller.start()
+
+    monkeypatch.setattr(app_module, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(app_module, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(app_module, "SMTP_SSL", False)
+    monkeypatch.delenv("EMAIL_USER", raising=False)
+    monkeypatch.delenv("EMAIL_PASS", raising=False)
+
+    with app_module.app.app_context():
+        app_module.EmailOutbox.query.delete()
+        app_module.db.session.commit()
+
+    yield sink
+
+    app_module._close_smtp()
+    controller.stop()
+
+
+def queue(app_module, to_email, subject="Stock alert"):
+    with app_module.app.app_context():
+        app_module.send_email(to_email, subject, "body")
+        return app_module.EmailOutbox.query.filter_by(to_email=to_email).one().id
+
+
+def outbox_row(app_module, message_id):
+    with app_module.app.app_context():
+        return app_module.db.session.get(app_module.EmailOutbox, message_id)
+
+
+def test_claimed_messages_are_delivered_to_the_sink(app_module, outbox):
+    ids = [queue(app_module, f"user{i}@example.com") for i in range(3)]
+
+    with app_module.app.app_context():
+        claimed = app_module._claim_outbox_batch(10)
+
+    assert sorted(claimed) == sorted(ids)
+
+    for message_id in claimed:
+        app_module._deliver_message(message_id)
+
+    assert sorted(envelope.rcpt_tos[0] for envelope in outbox.messages) == [
+        f"user{i}@example.com" for i in range(3)
+    ]
+
+    for message_id in ids:
+        row = outbox_row(app_module, message_id)
+        assert row.status == "sent" and row.attempts == 1 and row.latency_ms is not None
+
+
+def test_lease_blocks_reclaim_until_it_expires(app_module, outbox):
+    message_id = queue(app_module, "lease@example.com")
+
+    with app_module.app.app_context():
+        assert app_module._claim_outbox_batch(10) == [message_id]
+        # Held by the first claim
+        assert app_module._claim_outbox_batch(10) == []
+
+        row = app_module.db.session.get(app_module.EmailOutbox, message_id)
+        assert row.status == "sending"
+        assert row.next_attempt_at > datetime.utcnow() + timedelta(
+            seconds=app_module.OUTBOX_LEASE_SECONDS - 60
+        )
+
+        # The claiming dispatcher died: once the lease runs out it is reclaimed
+        row.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        app_module.db.session.commit()
+
+        assert app_module._claim_outbox_batch(10) == [message_id]
+
+    app_module._deliver_message(message_id)
+    assert [envelope.rcpt_tos for envelope in outbox.messages] == [["lease@example.com"]]
+
+
+def test_failed_delivery_backs_off(app_module, outbox, monkeypatch):
+    monkeypatch.setattr(app_module, "SMTP_PORT", free_port())
+    message_id = queue(app_module, "retry@example.com")
+
+    with app_module.app.app_context():
+        app_module._claim_outbox_batch(10)
+
+    app_module._deliver_message(message_id)
+
+    row = outbox_row(app_module, message_id)
+    assert row.status == "pending" and row.attempts == 1 and row.last_error
+    assert row.next_attempt_at > datetime.utcnow() + timedelta(
+        seconds=app_module.OUTBOX_BACKOFF_SECONDS - 5
+    )
+    assert outbox.messages == []
+
+
+def test_importing_the_app_starts_no_dispatcher(app_module):
+    import threading
+
+    assert "email-outbox" not in [thread.name for thread in threading.enumerate()]
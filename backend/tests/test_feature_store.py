@@ -0,0 +1,63 @@
+import threading
+import numpy as np
+
+from model import pipeline
+from conftest import DATASET_PATH
+
+
+def counting_builds(monkeypatch):
+    calls = []
+    build = pipeline.build_pipeline
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(pipeline, "build_pipeline", counted)
+    return calls
+
+
+def test_concurrent_cold_reads_build_once(feature_store, monkeypatch):
+    calls = counting_builds(monkeypatch)
+    barrier = threading.Barrier(8)
+    frames = []
+
+    def read():
+        barrier.wait()
+        frames.append(feature_store.get_features(DATASET_PATH))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(frames) == 8 and all(frame is frames[0] for frame in frames)
+
+
+def test_disk_snapshot_matches_build(feature_store, monkeypatch):
+    built = feature_store.get_features(DATASET_PATH)
+    feature_store.clear_feature_store()
+
+    calls = counting_builds(monkeypatch)
+    loaded = feature_store.get_features(DATASET_PATH)
+
+    assert calls == []
+    assert loaded.equals(built)
+
+
+def test_product_and_category_lookups(feature_store):
+    snapshot = feature_store.get_snapshot(DATASET_PATH)
+    frame = snapshot.frame
+
+    product_id = frame["product_id"].iloc[len(frame) // 2]
+    assert snapshot.row(product_id)["product_id"] == product_id
+    assert snapshot.row(frame["product_id"].max() + 1) is None
+
+    for category in frame["category"].unique():
+        rows = snapshot.by_category(category)
+        expected = frame[frame["category"] == category]
+        np.testing.assert_array_equal(rows["product_id"], expected["product_id"])
+
+    assert snapshot.by_category("No such category").empty
@@ -0,0 +1,110 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+from model.festival_calendar import FestivalCalendar, FESTIVAL_PATH, _read_festivals
+
+
+def loop_scores(order_dates, festival_df):
+    # The original per-festival loop from build_pipeline
+    df = pd.DataFrame({"order_date": pd.to_datetime(order_dates)})
+    df["festival_score"] = 0
+
+    for _, fest in festival_df.iterrows():
+        fest_date = fest["Date"]
+        impact = fest.get("impact_score", 1)
+
+        start = fest_date - pd.Timedelta(days=7)
+        end = fest_date + pd.Timedelta(days=3)
+
+        df.loc[
+            (df["order_date"] >= start) &
+            (df["order_date"] <= end),
+            "festival_score"
+        ] = impact
+
+    return df["festival_score"].to_numpy()
+
+
+def calendar_scores(order_dates, festival_df):
+    calendar = FestivalCalendar(festival_df, days_before=7, days_after=3, category_boosts={})
+    return calendar.scores(pd.to_datetime(order_dates))
+
+
+def festivals(*dates):
+    return pd.DataFrame({"Date": pd.to_datetime(list(dates))})
+
+
+def test_window_bounds_and_midnight_edge():
+    fest = festivals("2024-03-10")
+    orders = [
+        "2024-03-02 23:59:59",  # day before the window
+        "2024-03-03 00:00:00",  # window start
+        "2024-03-03 12:00:00",
+        "2024-03-10 18:30:00",  # festival day
+        "2024-03-13 00:00:00",  # window end, only its midnight instant
+        "2024-03-13 00:00:01",
+        "2024-03-13 23:00:00",
+        "2025-01-01 00:00:00"
+    ]
+
+    expected = loop_scores(orders, fest)
+    np.testing.assert_array_equal(calendar_scores(orders, fest), expected)
+    np.testing.assert_array_equal(expected, [0, 1, 1, 1, 1, 0, 0, 0])
+
+
+def test_overlapping_windows():
+    # Windows of festivals 2 and 5 days apart overlap, and one window's
+    # midnight end falls inside the next window
+    fest = festivals("2024-10-20", "2024-10-22", "2024-10-27", "2024-11-30")
+    days = pd.date_range("2024-10-01", "2024-12-10", freq="6h")
+
+    np.testing.assert_array_equal(
+        calendar_scores(days, fest),
+        loop_scores(days, fest)
+    )
+
+
+def test_overlapping_windows_take_highest_impact():
+    # Where windows with different impact overlap the calendar keeps the
+    # highest score; the loop kept whichever festival came last in the file
+    fest = festivals("2024-10-20", "2024-10-22")
+    fest["impact_score"] = [3, 2]
+
+    scores = calendar_scores(["2024-10-21 00:00", "2024-10-24 06:00", "2024-10-25 00:00"], fest)
+    np.testing.assert_array_equal(scores, [3, 2, 2])
+
+
+@pytest.mark.skipif(not os.path.exists(FESTIVAL_PATH), reason="no festival CSV")
+def test_shipped_calendar():
+    fest = _read_festivals(FESTIVAL_PATH)
+    rng = np.random.default_rng(0)
+    seconds = rng.integers(
+        pd.Timestamp("2019-12-01").value // 10**9,
+        pd.Timestamp("2027-01-31").value // 10**9,
+        5_000
+    )
+    # Mix random instants with midnights, where the window-end edge applies
+    orders = np.concatenate([
+        pd.to_datetime(seconds, unit="s").to_numpy(),
+        pd.to_datetime(seconds, unit="s").normalize().to_numpy()
+    ])
+
+    np.testing.assert_array_equal(
+        calendar_scores(orders, fest),
+        loop_scores(orders, fest)
+    )
+
+
+def test_category_codes_beyond_int8():
+    boosts = {f"Category {i}": 1 for i in range(200)}
+    calendar = FestivalCalendar(festivals("2024-03-10"), category_boosts=boosts)
+
+    codes = calendar.category_codes(["Category 0", "Category 150", "Category 199", "Other"])
+    np.testing.assert_array_equal(codes, [0, 150, 199, -1])
+
+
+def test_electronics_boost_always_present():
+    calendar = FestivalCalendar(festivals("2024-03-10"))
+    assert "festival_electronics_boost" in calendar.boost_features
@@ -0,0 +1,77 @@
+import os
+import threading
+import pandas as pd
+import pytest
+
+from model import pipeline, pipeline_state
+from model.ingest import load_sheets
+from conftest import DATASET_PATH
+
+# Fractions of the order, order item and inventory rows each upload holds;
+# products are complete from the first upload
+SLICES = [0.3, 0.55, 0.8, 1.0]
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_state, "STATE_DIR", str(tmp_path / "state"))
+    return tmp_path
+
+
+def write_upload(sheets, fraction, path):
+    os.makedirs(path)
+
+    for sheet, df in sheets.items():
+        if sheet != "blinkit_products":
+            df = df.iloc[:int(len(df) * fraction)]
+        df.to_parquet(os.path.join(path, sheet + ".parquet"))
+
+    return path
+
+
+def assert_same_output(actual, expected):
+    for name in ("aggregated", "daily_sales"):
+        pd.testing.assert_frame_equal(
+            actual[name].sort_values(list(actual[name].columns[:2])).reset_index(drop=True),
+            expected[name].sort_values(list(expected[name].columns[:2])).reset_index(drop=True),
+            check_exact=True
+        )
+
+
+def test_appended_uploads_match_full_recompute(state_dir):
+    sheets = load_sheets(DATASET_PATH)
+
+    for i, fraction in enumerate(SLICES):
+        upload = write_upload(sheets, fraction, str(state_dir / f"upload_{i}"))
+
+        incremental = pipeline.build_pipeline(upload, state_key="warehouse")
+        full = pipeline.build_pipeline(upload)
+
+        assert_same_output(incremental, full)
+
+
+def test_concurrent_updates_for_one_key(state_dir):
+    sheets = load_sheets(DATASET_PATH)
+    uploads = [
+        write_upload(sheets, fraction, str(state_dir / f"upload_{i}"))
+        for i, fraction in enumerate(SLICES)
+    ]
+    errors = []
+
+    def update(upload):
+        try:
+            assert_same_output(
+                pipeline.build_pipeline(upload, state_key="warehouse"),
+                pipeline.build_pipeline(upload)
+            )
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=update, args=(upload,)) for upload in uploads * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert not [name for name in os.listdir(pipeline_state.STATE_DIR) if name.endswith(".tmp")]
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from model import pipeline
+from conftest import DATASET_PATH
+
+
+def sorted_output(output):
+    return {
+        name: output[name].sort_values(list(output[name].columns[:2])).reset_index(drop=True)
+        for name in ("aggregated", "daily_sales")
+    }
+
+
+def test_partitioned_builds_match_and_share_a_pool():
+    expected = sorted_output(pipeline.build_pipeline(DATASET_PATH, workers=1))
+
+    for _ in range(2):
+        actual = sorted_output(pipeline.build_pipeline(DATASET_PATH, workers=2))
+
+        for name in expected:
+            pd.testing.assert_frame_equal(actual[name], expected[name], check_exact=True)
+
+    pool = pipeline._pools[2]
+    pipeline.build_pipeline(DATASET_PATH, workers=2)
+    assert pipeline._pools[2] is pool
@@ -0,0 +1,55 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+from model import predict
+from conftest import DATASET_PATH
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    # A wide in-process pool standing in for the shared batch pool, and a
+    # features step that records how many datasets ran at once
+    pool = ThreadPoolExecutor(max_workers=8)
+    monkeypatch.setattr(predict, "_get_batch_pool", lambda: pool)
+
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+    features = predict.get_features(DATASET_PATH)
+
+    def aggregated_features(dataset_path, source_name=None):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        try:
+            time.sleep(0.05)
+            if dataset_path == "broken":
+                raise ValueError("Required sheets missing in Excel file.")
+            return features
+        finally:
+            with lock:
+                state["running"] -= 1
+
+    monkeypatch.setattr(predict, "_aggregated_features", aggregated_features)
+    yield state
+    pool.shutdown()
+
+
+def test_max_workers_caps_datasets_in_flight(thread_pool):
+    datasets = {f"W{i}": DATASET_PATH for i in range(6)}
+
+    results, errors = predict.predict_stockout_batch(datasets, max_workers=2)
+
+    assert thread_pool["peak"] == 2
+    assert list(results) == list(datasets) and errors == {}
+
+
+def test_failed_datasets_are_reported_in_order(thread_pool):
+    datasets = {"A": DATASET_PATH, "B": "broken", "C": DATASET_PATH}
+
+    results, errors = predict.predict_stockout_batch(datasets, max_workers=3)
+
+    assert list(results) == ["A", "C"]
+    assert errors == {"B": "Required sheets missing in Excel file."}
+    assert results["A"].equals(results["C"])
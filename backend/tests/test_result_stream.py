@@ -0,0 +1,62 @@
+import json
+import pandas as pd
+import pytest
+
+from model.result_stream import select_columns, page, stream_json, stream_ndjson
+
+
+@pytest.fixture
+def result():
+    return pd.DataFrame({
+        "product_id": [1, 2, 3],
+        "product_name": ["a", "b", None],
+        "days_left": [4, 70, 10]
+    })
+
+
+@pytest.mark.parametrize("fields", [",", "product_id,", " , product_id", "product_id,,days_left"])
+def test_empty_field_names_are_rejected(result, fields):
+    with pytest.raises(ValueError):
+        select_columns(result, fields)
+
+
+def test_unknown_fields_are_rejected(result):
+    with pytest.raises(ValueError, match="Unknown fields: nope"):
+        select_columns(result, "product_id,nope")
+
+
+@pytest.mark.parametrize("cursor, limit", [("abc", None), (None, "abc"), ("-1", None), (None, "0")])
+def test_invalid_paging_is_rejected(result, cursor, limit):
+    with pytest.raises(ValueError):
+        page(result, cursor=cursor, limit=limit)
+
+
+def test_pages_cover_every_row(result):
+    rows, cursor = page(result, limit=2)
+    assert rows["product_id"].tolist() == [1, 2] and cursor == "2"
+
+    rows, cursor = page(result, cursor=cursor, limit=2)
+    assert rows["product_id"].tolist() == [3] and cursor is None
+
+
+def test_streams_round_trip(result):
+    body = json.loads("".join(stream_json(result, total_rows=3)))
+    assert body["total_rows"] == 3
+    assert body["fields"] == result.astype(object).where(result.notna(), None).to_dict(orient="records")
+
+    lines = "".join(stream_ndjson(select_columns(result, "days_left"))).splitlines()
+    assert [json.loads(line) for line in lines] == [{"days_left": 4}, {"days_left": 70}, {"days_left": 10}]
+
+
+def test_route_rejects_empty_fields_before_streaming(app_module, client, result):
+    from model import result_cache
+
+    assert result_cache.put_result("empty-fields-test", result)
+
+    response = client.get("/predict-results/empty-fields-test?fields=,")
+    assert response.status_code == 400
+    assert "fields" in response.get_json()["error"]
+
+    response = client.get("/predict-results/empty-fields-test?fields=product_id&limit=2")
+    body = json.loads(response.get_data())
+    assert body["fields"] == [{"product_id": 1}, {"product_id": 2}] and body["next_cursor"] == "2"
@@ -0,0 +1,55 @@
+import os
+import threading
+import pytest
+
+from model import ingest
+from conftest import DATASET_PATH
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "CACHE_DIR", str(tmp_path / "sheet_cache"))
+    return tmp_path / "sheet_cache"
+
+
+def cache_entry():
+    return os.path.join(
+        ingest.CACHE_DIR, f"{ingest.file_sha256(DATASET_PATH)}-v{ingest.SCHEMA_VERSION}"
+    )
+
+
+def test_concurrent_first_loads(cache_dir):
+    barrier = threading.Barrier(4)
+    results, errors = [], []
+
+    def load():
+        barrier.wait()
+        try:
+            results.append(ingest.load_sheets(DATASET_PATH))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=load) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(os.listdir(cache_entry())) == sorted(f"{sheet}.feather" for sheet in ingest.REQUIRED_SHEETS)
+
+
+def test_corrupt_entry_falls_back_to_workbook(cache_dir):
+    expected = ingest.load_sheets(DATASET_PATH)
+
+    path = os.path.join(cache_entry(), "blinkit_inventory.feather")
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) // 2)
+
+    sheets = ingest.load_sheets(DATASET_PATH)
+
+    for sheet, df in expected.items():
+        assert sheets[sheet].equals(df)
+
+    # Rewritten from the workbook, so the next load is a clean cache hit
+    assert ingest.load_sheets(DATASET_PATH)["blinkit_inventory"].equals(expected["blinkit_inventory"])
@@ -0,0 +1,93 @@
+from datetime import date
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture
+def reminders(app_module, monkeypatch):
+    # Empty reminder table; confirmation emails are queued but never sent
+    monkeypatch.setattr(app_module, "send_email", lambda *args, **kwargs: None)
+
+    with app_module.app.app_context():
+        app_module.StockoutReminder.query.delete()
+        app_module.db.session.commit()
+
+    return app_module.StockoutReminder
+
+
+def stored(app_module):
+    with app_module.app.app_context():
+        return sorted(
+            (r.email, r.product_name, r.stockout_date)
+            for r in app_module.StockoutReminder.query.all()
+        )
+
+
+def test_resubmitted_reminders_are_skipped(app_module, client, reminders):
+    results = [
+        {"product_name": "Milk", "stockout_date": "2026-11-02"},
+        {"product_name": "Bread", "stockout_date": "2026-11-03"},
+        # Repeat within the request, and a row without a valid date
+        {"product_name": "Milk", "stockout_date": "2026-11-02"},
+        {"product_name": "Eggs", "stockout_date": "soon"}
+    ]
+    payload = {"email": "store@example.com", "results": results}
+
+    response = client.post("/create-stockout-reminders", json=payload)
+    assert response.status_code == 201
+    assert response.get_json()["inserted"] == 2
+    assert response.get_json()["skipped"] == 2
+
+    results.append({"product_name": "Butter", "stockout_date": "2026-11-04"})
+    response = client.post("/create-stockout-reminders", json=payload)
+    assert response.get_json()["inserted"] == 1
+    assert response.get_json()["skipped"] == 4
+
+    assert stored(app_module) == [
+        ("store@example.com", "Bread", date(2026, 11, 3)),
+        ("store@example.com", "Butter", date(2026, 11, 4)),
+        ("store@example.com", "Milk", date(2026, 11, 2))
+    ]
+
+
+def test_same_products_for_another_email_are_kept(app_module, client, reminders):
+    results = [{"product_name": "Milk", "stockout_date": "2026-11-02"}]
+
+    for email in ("a@example.com", "b@example.com"):
+        response = client.post("/create-stockout-reminders", json={"email": email, "results": results})
+        assert response.get_json()["inserted"] == 1
+
+    assert len(stored(app_module)) == 2
+
+
+def test_startup_migration_removes_duplicates(app_module, reminders):
+    table = reminders.__tablename__
+
+    with app_module.app.app_context():
+        with app_module.db.engine.begin() as conn:
+            # A database from before the unique key existed
+            conn.execute(text("DROP INDEX uq_stockout_reminder_email_product_date"))
+            conn.execute(text(f"""
+                INSERT INTO {table} (email, product_name, stockout_date, reminder_stage)
+                VALUES ('a@example.com', 'Milk', '2026-11-02', 0),
+                       ('a@example.com', 'Milk', '2026-11-02', 1),
+                       ('a@example.com', 'Bread', '2026-11-02', 0),
+                       ('a@example.com', 'Milk', '2026-11-03', 0)
+            """))
+
+        app_module._migrate_reminder_indexes()
+
+        rows = app_module.db.session.execute(text(
+            f"SELECT product_name, stockout_date, reminder_stage FROM {table} ORDER BY id"
+        )).all()
+        indexes = {
+            i["name"] for i in app_module.inspect(app_module.db.engine).get_indexes(table)
+        }
+
+    # The first of each duplicate group is the one kept
+    assert [tuple(row) for row in rows] == [
+        ("Milk", "2026-11-02", 0),
+        ("Bread", "2026-11-02", 0),
+        ("Milk", "2026-11-03", 0)
+    ]
+    assert "uq_stockout_reminder_email_product_date" in indexes
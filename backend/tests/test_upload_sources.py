@@ -0,0 +1,74 @@
+import io
+import os
+import glob
+import json
+import time
+from functools import partial
+from sqlalchemy import text
+
+from conftest import DATASET_PATH
+from model import predict
+
+
+def snapshot_sources(feature_store):
+    # dataset_path recorded by every stored snapshot
+    return sorted(
+        json.load(open(path))["dataset_path"]
+        for path in glob.glob(os.path.join(feature_store.STORE_DIR, "*", "meta.json"))
+    )
+
+
+def upload(name):
+    with open(DATASET_PATH, "rb") as f:
+        return (io.BytesIO(f.read()), name)
+
+
+def test_batch_snapshots_record_uploaded_names(app_module, client, feature_store, monkeypatch):
+    # In-process, so the snapshot lands in this test's store
+    monkeypatch.setattr(
+        app_module, "predict_stockout_batch",
+        partial(predict.predict_stockout_batch, max_workers=1)
+    )
+
+    response = client.post(
+        "/predict-batch",
+        data={"files": [upload("north.xlsx")], "warehouse_codes": ["N1"]},
+        content_type="multipart/form-data"
+    )
+
+    assert response.status_code == 200
+    assert snapshot_sources(feature_store) == ["north.xlsx"]
+
+
+def test_job_snapshots_record_uploaded_names(app_module, client, feature_store):
+    response = client.post(
+        "/predict-jobs",
+        data={"file": upload("south.xlsx")},
+        content_type="multipart/form-data"
+    )
+    job_id = response.get_json()["job_id"]
+
+    for _ in range(200):
+        status = client.get(f"/predict-jobs/{job_id}").get_json()["status"]
+        if status in ("done", "failed"):
+            break
+        time.sleep(0.05)
+
+    assert status == "done"
+    assert snapshot_sources(feature_store) == ["south.xlsx"]
+
+
+def test_source_name_column_is_added_to_old_tables(app_module):
+    with app_module.app.app_context():
+        with app_module.db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE predict_job DROP COLUMN source_name"))
+
+        # Pooled connections may still hold the old schema
+        app_module.db.session.remove()
+        app_module.db.engine.dispose()
+
+        app_module._migrate_predict_job_columns()
+
+        columns = {c["name"] for c in app_module.inspect(app_module.db.engine).get_columns("predict_job")}
+
+    assert "source_name" in columns